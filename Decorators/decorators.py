@@ -1,31 +1,37 @@
 # decorators.py
 
 import functools
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User
+from flask import jsonify, make_response, request
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from models import db, User
+from services import idempotency, replica
 
 
 def require_role(*roles):
+    """
+    Require a valid access token whose user has one of ``roles``.
+    Applies @jwt_required() itself, so routes do not need to stack it.
+    """
+    allowed_roles = [role.lower() for role in roles]
+
     def decorator(fn):
         @functools.wraps(fn)
         @jwt_required()
         def wrapper(*args, **kwargs):
             current_user_id = get_jwt_identity()
-            user = User.query.filter_by(id=int(current_user_id)).first()
-
-            if not user:
-                return jsonify({'message': 'User not found'}), 404
-
-            user_role = user.role.lower()
-            allowed_roles = []
-            for role in roles:
-                print(role)
-                allowed_roles.append(role.lower())
+            claims = get_jwt()
 
+            if 'role' in claims:
+                # Authorize from the token; revoked tokens were already rejected by jwt_required
+                user_role = claims['role'].lower()
+            else:
+                # Tokens issued before roles were added to the claims
+                user = db.session.get(User, int(current_user_id))
+                if not user:
+                    return jsonify({'message': 'User not found'}), 404
+                user_role = user.role.lower()
 
             if user_role not in allowed_roles:
-                print()
                 return jsonify({'message': 'Access forbidden: insufficient permissions'}), 403
 
             return fn(*args, **kwargs)
@@ -33,3 +39,67 @@ def require_role(*roles):
         return wrapper
 
     return decorator
+
+
+def idempotent(fn):
+    """
+    Honor an Idempotency-Key header: the first response for a key is stored
+    and replayed to retries with the same key, per user and route, without
+    running the route again. Place it below @require_role.
+
+    The route flushes its writes and leaves the transaction open. This
+    decorator commits it, together with the stored response when a key was
+    sent, so a worker dying in between cannot leave a committed booking
+    behind a claim that a retry would take over and run again.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(idempotency.HEADER)
+        if key is None:
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code >= 500:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            return response
+        if not key or len(key) > idempotency.MAX_KEY_LENGTH:
+            return jsonify({
+                'message': f'{idempotency.HEADER} must be 1 to {idempotency.MAX_KEY_LENGTH} characters.'
+            }), 400
+
+        record_id = idempotency.record_id(get_jwt_identity(), request.endpoint, key)
+        request_hash = idempotency.fingerprint(request.get_data())
+        result = idempotency.lookup(record_id) or idempotency.claim(record_id, request_hash)
+        if result is not None:
+            return idempotency.replay(result, request_hash)
+
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            idempotency.release(record_id)
+            raise
+        if response.status_code >= 500:
+            idempotency.release(record_id)
+            return response
+        try:
+            idempotency.complete(record_id, request_hash, response)
+        except Exception:
+            idempotency.release(record_id)
+            raise
+        return response
+
+    return wrapper
+
+
+def read_replica(fn):
+    """
+    Run the route's queries on the read replica, if one is configured.
+    Writes, and reads by a user who has just written, stay on the primary.
+    Place it below @jwt_required / @require_role so the user is known.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        replica.route_reads_to_replica()
+        return fn(*args, **kwargs)
+
+    return wrapper
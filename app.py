@@ -1,32 +1,75 @@
 import os
 from flask import Flask, send_from_directory, render_template
-from flask_swagger_ui import get_swaggerui_blueprint
 from dotenv import load_dotenv
 from models import db  # Importing the database object from models package
 from routes import init_app  # Importing the function to register blueprints
+from commands import register_commands
+from services import cache, compression, metrics, ratelimit, replica, tokens
+from services.json_provider import FastJSONProvider
+from services.log import init_logging
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Load environment variables from .env file
 load_dotenv()
 
 
+def parse_flag(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+# Connection pool settings: (env var, engine option, parser, SQL Server default)
+POOL_SETTINGS = [
+    ('DB_POOL_SIZE', 'pool_size', int, 5),
+    ('DB_MAX_OVERFLOW', 'max_overflow', int, 10),
+    ('DB_POOL_TIMEOUT', 'pool_timeout', int, 30),
+    ('DB_POOL_RECYCLE', 'pool_recycle', int, 1800),
+    ('DB_POOL_PRE_PING', 'pool_pre_ping', parse_flag, True),
+    ('DB_FAST_EXECUTEMANY', 'fast_executemany', parse_flag, True),
+]
+
+
+def engine_options(use_defaults):
+    """
+    Engine options from the DB_* pool env vars. The defaults are only
+    applied for SQL Server; with DATABASE_URL only the variables that are
+    set are passed on (SQLite's pools take fewer options).
+    """
+    options = {}
+    for env_name, option, parse, default in POOL_SETTINGS:
+        value = os.getenv(env_name)
+        if value is not None:
+            options[option] = parse(value)
+        elif use_defaults:
+            options[option] = default
+    return options
+
+
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)  # orjson if installed; ISO 8601 dates
+
+    # Structured JSON logs, written to stdout by a background thread
+    init_logging(os.getenv('LOG_LEVEL', 'INFO'))
 
     ### Swagger UI Configuration ###
-    SWAGGER_URL = '/swagger'  # URL to access Swagger UI
-    API_URL = '/static/swagger.yaml'  # Path to swagger
-
-    swaggerui_blueprint = get_swaggerui_blueprint(
-        SWAGGER_URL,  # Swagger UI endpoint
-        API_URL,  # Swagger spec URL
-        config={  # Swagger UI config overrides
-            'app_name': "ShortTermStayCompanyAPI"
-        }
-    )
+    # Imported here so workers started with SWAGGER_UI=false never load it
+    if parse_flag(os.getenv('SWAGGER_UI', 'true')):
+        from flask_swagger_ui import get_swaggerui_blueprint
+
+        SWAGGER_URL = '/swagger'  # URL to access Swagger UI
+        API_URL = '/static/swagger.yaml'  # Path to swagger
 
-    app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+        swaggerui_blueprint = get_swaggerui_blueprint(
+            SWAGGER_URL,  # Swagger UI endpoint
+            API_URL,  # Swagger spec URL
+            config={  # Swagger UI config overrides
+                'app_name': "ShortTermStayCompanyAPI"
+            }
+        )
+
+        app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
     ### Serve Swagger YAML ###
     @app.route('/static/<path:path>')
@@ -44,20 +87,86 @@ def create_app():
         return "Pong", 200
 
     ### Configure the database connection string ###
-    server = os.getenv('DB_SERVER')
-    database = os.getenv('DB_NAME')
-    username = os.getenv('DB_USERNAME')
-    SQL_password = os.getenv('DB_PASSWORD')
-    driver = os.getenv('DB_DRIVER')
-
-    # Check if all required environment variables are present
-    if not all([server, database, username, SQL_password, driver]):
-        raise SystemExit("Error: Missing required database environment variables")
-
-    app.config[
-        'SQLALCHEMY_DATABASE_URI'] = f'mssql+pyodbc://{username}:{SQL_password}@{server}/{database}?driver={driver}'
+    # DATABASE_URL (any SQLAlchemy URL, e.g. sqlite:///bench.db) overrides the SQL Server settings
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(use_defaults=False)
+    else:
+        server = os.getenv('DB_SERVER')
+        database = os.getenv('DB_NAME')
+        username = os.getenv('DB_USERNAME')
+        SQL_password = os.getenv('DB_PASSWORD')
+        driver = os.getenv('DB_DRIVER')
+
+        # Check if all required environment variables are present
+        if not all([server, database, username, SQL_password, driver]):
+            raise SystemExit("Error: Missing required database environment variables")
+
+        app.config[
+            'SQLALCHEMY_DATABASE_URI'] = f'mssql+pyodbc://{username}:{SQL_password}@{server}/{database}?driver={driver}'
+        # Pool sizing, pre-ping/recycle for dropped Azure SQL connections, and
+        # fast_executemany to send bulk inserts to SQL Server in one round trip
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(use_defaults=True)
+
+    # Optional read replica for @read_replica routes: DB_REPLICA_URL (any SQLAlchemy URL),
+    # or DB_REPLICA_SERVER with the other DB_REPLICA_* settings defaulting to the primary's
+    replica_url = os.getenv('DB_REPLICA_URL')
+    if not replica_url and os.getenv('DB_REPLICA_SERVER'):
+        replica_url = (
+            f"mssql+pyodbc://{os.getenv('DB_REPLICA_USERNAME', os.getenv('DB_USERNAME'))}"
+            f":{os.getenv('DB_REPLICA_PASSWORD', os.getenv('DB_PASSWORD'))}@{os.getenv('DB_REPLICA_SERVER')}"
+            f"/{os.getenv('DB_REPLICA_NAME', os.getenv('DB_NAME'))}?driver={os.getenv('DB_REPLICA_DRIVER', os.getenv('DB_DRIVER'))}"
+        )
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {
+            replica.REPLICA_BIND: {'url': replica_url, **app.config['SQLALCHEMY_ENGINE_OPTIONS']}
+        }
+    # Seconds a user's reads stay on the primary after they write
+    app.config['DB_REPLICA_STICKY_SECONDS'] = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '10'))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Password hashing: algorithm/cost and the hashing processes for the whole host,
+    # shared out between the WEB_CONCURRENCY gunicorn workers
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    app.config['WEB_CONCURRENCY'] = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+    # Response cache for GET /listings: 'memory' (per worker) or 'none'
+    app.config['RESPONSE_CACHE_BACKEND'] = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', '30'))
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+
+    # Seconds between background rebuilds of the /locations autocomplete index
+    app.config['LOCATION_INDEX_TTL'] = int(os.getenv('LOCATION_INDEX_TTL', '300'))
+
+    # Seconds a response stored for an Idempotency-Key is replayed to retries
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+
+    # Seconds each worker caches a user's token version; a revocation reaches every worker within it
+    app.config['TOKEN_VERSION_TTL'] = int(os.getenv('TOKEN_VERSION_TTL', '30'))
+
+    # Token-bucket rate limits per client: 'memory' (per worker) or 'none', and budgets per blueprint
+    app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    app.config['RATE_LIMITS'] = {**ratelimit.DEFAULT_LIMITS, **ratelimit.parse_limits(os.getenv('RATE_LIMITS', ''))}
+
+    # Proxies in front of the app whose X-Forwarded-For/-Proto are trusted; 0 uses the socket address
+    app.config['TRUSTED_PROXY_HOPS'] = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+    if app.config['TRUSTED_PROXY_HOPS']:
+        hops = app.config['TRUSTED_PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    # Background report jobs: result directory (default: system temp dir) and pool size per worker
+    app.config['REPORT_JOBS_DIR'] = os.getenv('REPORT_JOBS_DIR')
+    app.config['REPORT_JOB_WORKERS'] = int(os.getenv('REPORT_JOB_WORKERS', '2'))
+    app.config['REPORT_JOB_MAX_QUEUED'] = int(os.getenv('REPORT_JOB_MAX_QUEUED', '8'))
+    # Seconds a job may stay queued or running before it is marked failed (its worker may be gone)
+    app.config['REPORT_JOB_TIMEOUT'] = int(os.getenv('REPORT_JOB_TIMEOUT', '3600'))
+
+    # gzip/brotli for responses of at least COMPRESSION_MIN_SIZE bytes
+    app.config['RESPONSE_COMPRESSION'] = parse_flag(os.getenv('RESPONSE_COMPRESSION', 'true'))
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
     # Configure JWT
     jwt_secret_key = os.getenv('JWT_SECRET_KEY')
     if not jwt_secret_key:
@@ -65,6 +174,8 @@ def create_app():
 
     app.config['JWT_SECRET_KEY'] = jwt_secret_key
     jwt = JWTManager(app)
+    # Every protected route rejects tokens older than the user's token version (revoked)
+    jwt.token_in_blocklist_loader(tokens.token_revoked)
 
     # Initialize extensions
     db.init_app(app)  # Initialize the database
@@ -72,9 +183,19 @@ def create_app():
 
     # Register routes
     init_app(app)  # Register the blueprints using the init_app function
-
-    with app.app_context():
-        db.create_all()  # This will create all tables for the registered models
+    register_commands(app)  # Register the flask CLI commands
+    metrics.init_app(app)  # Request latency / SQL / row metrics on /metrics
+    ratelimit.init_app(app)  # 429 for clients over their budget, before the view runs
+    replica.init_app(app)  # Keep users on the primary right after their own writes
+    cache.init_app(app)  # Response cache backends
+    compression.init_app(app)  # Negotiated gzip/brotli response compression
+
+    # Tables are created with `flask init-db`. DB_CREATE_ALL=true keeps the old
+    # create-on-startup behaviour for deployments without a shell.
+    if parse_flag(os.getenv('DB_CREATE_ALL', 'false')):
+        with app.app_context():
+            db.create_all()  # This will create all tables for the registered models
+            db.engine.dispose()  # Don't hand this connection to forked workers
 
     return app
 
@@ -0,0 +1,232 @@
+"""
+Optional asyncio (ASGI) serving mode for the read-heavy routes.
+
+    pip install -r requirements-async.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+GET /v1/listing/listings and GET /v1/booking/get_bookings run on
+SQLAlchemy's async engine (aioodbc for SQL Server, aiosqlite for SQLite),
+so one process keeps many reads in flight while they wait on the database.
+They share parsing, statements and serialization with the Flask routes
+(services/listings.py, services/bookings.py, services/pagination.py) and
+render and compress JSON like the Flask app, so responses are the same.
+Every other request is passed to the Flask app.
+
+The async routes skip the listings response cache, ETags and rate limits,
+and are not counted on /metrics.
+"""
+import logging
+from urllib.parse import parse_qsl
+
+import jwt
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MultiDict
+
+from app import app as flask_app
+from models import Booking, Listing
+from services import availability, bookings, compression, listings, ratings, tokens
+from services.pagination import (
+    InvalidCursor, count_statement, cursor_meta, offset_meta, offset_statement, seek_result, seek_statement
+)
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {'mssql+pyodbc': 'mssql+aioodbc', 'sqlite': 'sqlite+aiosqlite'}
+
+
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def async_database_url(url):
+    url = make_url(url)
+    if url.drivername not in ASYNC_DRIVERS:
+        raise SystemExit(f'Error: no async driver configured for {url.drivername}')
+    return url.set(drivername=ASYNC_DRIVERS[url.drivername])
+
+
+def _engine_options():
+    # fast_executemany is a pyodbc write optimization; these routes only read
+    options = dict(flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.pop('fast_executemany', None)
+    return options
+
+
+engine = create_async_engine(async_database_url(flask_app.config['SQLALCHEMY_DATABASE_URI']), **_engine_options())
+Session = async_sessionmaker(engine, expire_on_commit=False)
+wsgi_app = WSGIMiddleware(flask_app)
+
+
+async def _token_version(user_id):
+    """tokens.current_token_version on the async engine, sharing its cache."""
+    version = tokens.cached_token_version(user_id)
+    if version is None:
+        async with Session() as session:
+            version = (await session.execute(tokens.token_version_statement(user_id))).scalar()
+        if version is not None:
+            tokens.remember_token_version(
+                user_id, version, flask_app.config.get('TOKEN_VERSION_TTL', tokens.DEFAULT_TOKEN_VERSION_TTL))
+    return version
+
+
+async def jwt_identity(headers, optional=False):
+    """
+    Identity of the request's access token, checked like flask-jwt-extended
+    does: 401 when missing, expired or revoked, 422 when invalid.
+    """
+    authorization = headers.get('authorization', '')
+    if not authorization:
+        if optional:
+            return None
+        raise AuthError('Missing Authorization Header')
+    scheme, _, token = authorization.partition(' ')
+    if scheme != 'Bearer' or not token:
+        raise AuthError("Missing 'Bearer' type in 'Authorization' header. Expected 'Authorization: Bearer <JWT>'")
+    try:
+        claims = jwt.decode(token, flask_app.config['JWT_SECRET_KEY'],
+                            algorithms=[flask_app.config.get('JWT_ALGORITHM', 'HS256')])
+    except jwt.ExpiredSignatureError:
+        raise AuthError('Token has expired')
+    except jwt.InvalidTokenError as e:
+        raise AuthError(str(e), status=422)
+    if claims.get('type') != 'access':
+        raise AuthError('Only non-refresh tokens are allowed', status=422)
+    if claims.get('ver', 0) != await _token_version(claims['sub']):
+        raise AuthError('Token has been revoked')
+    return claims['sub']
+
+
+async def get_listing(args, headers):
+    """Async twin of routes.listing.get_listing."""
+    await jwt_identity(headers, optional=True)
+    search, error = listings.parse_search(args)
+    if error:
+        return 400, {'message': error}
+
+    statement = listings.search_statement(search)
+    per_page = search['per_page']
+    async with Session() as session:
+        if search['cursor'] is not None:
+            try:
+                statement = seek_statement(statement, Listing.id, search['cursor'], per_page)
+            except InvalidCursor as e:
+                return 400, {'message': str(e)}
+            rows = (await session.execute(statement)).all()
+            page_listings, next_cursor = seek_result(rows, Listing.id, per_page)
+            meta = cursor_meta(per_page, next_cursor)
+        else:
+            total = (await session.execute(count_statement(statement))).scalar()
+            statement = offset_statement(statement.order_by(Listing.id.desc()), search['page'], per_page)
+            page_listings = (await session.execute(statement)).all()
+            meta = offset_meta(search['page'], per_page, total)
+
+        listing_ids = [listing.id for listing in page_listings]
+        fields = search['fields']
+        booked_ranges = average_ratings = None
+        if 'unavailableDates' in fields:
+            booked_ranges = {}
+            if listing_ids:
+                rows = await session.execute(availability.booked_ranges_statement(listing_ids))
+                booked_ranges = availability.group_ranges(listing_ids, rows)
+        if 'averageRating' in fields:
+            average_ratings = {}
+            if listing_ids:
+                rows = await session.execute(ratings.averages_statement(listing_ids))
+                average_ratings = ratings.group_averages(rows)
+
+    data = listings.serialize_listings(page_listings, booked_ranges, average_ratings, fields)
+    return 200, {'data': data, 'meta': meta}
+
+
+async def get_bookings(args, headers):
+    """Async twin of routes.booking.get_bookings."""
+    current_user_id = await jwt_identity(headers)
+    query, error = bookings.parse_query(args)
+    if error:
+        return 400, {'message': error}
+    statement = bookings.bookings_statement(current_user_id, query)
+
+    meta = None
+    per_page = query['per_page']
+    async with Session() as session:
+        if query['cursor'] is not None:
+            try:
+                statement = seek_statement(statement, Booking.id, query['cursor'], per_page)
+            except InvalidCursor as e:
+                return 400, {'message': str(e)}
+            rows = (await session.execute(statement)).all()
+            user_bookings, next_cursor = seek_result(rows, Booking.id, per_page)
+            meta = cursor_meta(per_page, next_cursor)
+        elif query['page'] is not None:
+            total = (await session.execute(count_statement(statement))).scalar()
+            statement = offset_statement(statement.order_by(Booking.id.desc()), query['page'], per_page)
+            user_bookings = (await session.execute(statement)).all()
+            meta = offset_meta(query['page'], per_page, total)
+        else:
+            user_bookings = (await session.execute(statement)).all()
+
+    booking_list = [bookings.serialize_booking(row, query['fields']) for row in user_bookings]
+    if meta is not None:
+        return 200, {"bookings": booking_list, "meta": meta}
+    return 200, {"bookings": booking_list}
+
+
+ROUTES = {
+    '/v1/listing/listings': get_listing,
+    '/v1/booking/get_bookings': get_bookings,
+}
+
+
+async def _send_json(send, status, payload, accept_encoding=None):
+    body = (flask_app.json.dumps(payload) + '\n').encode()
+    headers = [(b'content-type', b'application/json')]
+    if (status == 200 and flask_app.config.get('RESPONSE_COMPRESSION', True)
+            and len(body) >= flask_app.config.get('COMPRESSION_MIN_SIZE', compression.DEFAULT_MIN_SIZE)):
+        headers.append((b'vary', b'Accept-Encoding'))
+        encoding = compression.negotiate(accept_encoding)
+        if encoding is not None:
+            body = compression.compress(body, encoding)
+            headers.append((b'content-encoding', encoding.encode()))
+    headers.append((b'content-length', str(len(body)).encode()))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    handler = ROUTES.get(scope.get('path')) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+    if handler is None:
+        return await wsgi_app(scope, receive, send)
+
+    args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    try:
+        status, payload = await handler(args, headers)
+    except AuthError as e:
+        status, payload = e.status, {'msg': e.message}
+    except Exception as e:
+        logger.exception('Async request failed', extra={'path': scope['path']})
+        status, payload = 500, {'message': 'An unexpected error occurred.', 'error': str(e)}
+    await _send_json(send, status, payload, headers.get('accept-encoding'))
@@ -0,0 +1,78 @@
+"""
+Compare the legacy one-row-per-night availability model with merged ranges.
+
+Run from the repository root:
+    python -m benchmarks.availability_bench --listings 2000 --bookings 40
+"""
+import argparse
+import random
+import timeit
+from datetime import date, timedelta
+
+from services.availability import covers, merge_ranges, overlaps
+
+
+def generate(listings, bookings_per_listing, seed):
+    rnd = random.Random(seed)
+    start = date(2025, 1, 1)
+    end = date(2025, 12, 31)
+    data = []
+    for _ in range(listings):
+        nights = []
+        for _ in range(bookings_per_listing):
+            first = start + timedelta(days=rnd.randrange(0, 360))
+            length = rnd.randrange(1, 8)
+            nights.extend(first + timedelta(days=offset) for offset in range(length) if first + timedelta(days=offset) <= end)
+        data.append((start, end, sorted(set(nights))))
+    return data
+
+
+def row_per_day(data, queries):
+    """What /listings and insert_booking did before: rebuild a set of dates per listing."""
+    for (available_from, available_to, nights), (query_from, query_to) in zip(data, queries):
+        booked = set(nights)
+        len(booked) == (available_to - available_from).days + 1
+        day = query_from
+        while day <= query_to:
+            if day in booked:
+                break
+            day += timedelta(days=1)
+
+
+def merged_ranges(data, queries):
+    for (available_from, available_to, ranges), (query_from, query_to) in zip(data, queries):
+        covers(ranges, available_from, available_to)
+        overlaps(ranges, query_from, query_to)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listings', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=40, help='Bookings per listing')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=4458)
+    args = parser.parse_args()
+
+    data = generate(args.listings, args.bookings, args.seed)
+    rnd = random.Random(args.seed)
+    queries = []
+    for _ in data:
+        query_from = date(2025, 1, 1) + timedelta(days=rnd.randrange(0, 358))
+        queries.append((query_from, query_from + timedelta(days=rnd.randrange(1, 7))))
+
+    ranged = [(available_from, available_to, merge_ranges((night, night) for night in nights))
+              for available_from, available_to, nights in data]
+
+    day_rows = sum(len(nights) for _, _, nights in data)
+    range_rows = sum(len(ranges) for _, _, ranges in ranged)
+    day_time = min(timeit.repeat(lambda: row_per_day(data, queries), number=1, repeat=args.repeat))
+    range_time = min(timeit.repeat(lambda: merged_ranges(ranged, queries), number=1, repeat=args.repeat))
+
+    print(f'{"model":<14}{"rows":>12}{"check time (ms)":>18}')
+    print(f'{"row-per-day":<14}{day_rows:>12}{day_time * 1000:>18.2f}')
+    print(f'{"ranges":<14}{range_rows:>12}{range_time * 1000:>18.2f}')
+    print(f'row reduction: {day_rows / max(range_rows, 1):.1f}x, speedup: {day_time / max(range_time, 1e-9):.1f}x')
+
+
+if __name__ == '__main__':
+    main()
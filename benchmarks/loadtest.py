@@ -0,0 +1,345 @@
+"""
+Concurrent load and contention test for a running server.
+
+Unlike benchmarks.run, which calls the app in-process one request at a
+time, this drives a server over HTTP from many threads at once, with a
+weighted mix of scenarios:
+
+    browse       GET /v1/listing/listings (random page, filters, date search)
+    my_bookings  GET /v1/booking/get_bookings of a random guest
+    book         POST /v1/booking/insert_booking
+    review       POST /v1/review/insert_review of one of the guest's unreviewed stays
+    login        POST /v1/auth/login (hashes a password)
+
+--hot-share of the bookings go to the --hot-listings first listings, for
+nights in their first --hot-days days, so guests compete for the same
+listing and dates. Conflicts (400) are expected there; the question is
+whether any got through. After the run the database is checked:
+
+- no two bookings of a listing share a night;
+- booked ranges of a listing do not overlap and cover every booking;
+- bookings lie inside their listing's availability window;
+- the number of new bookings equals the number of 201 responses.
+
+Seed a database with benchmarks.seed, serve it without rate limits, and
+point the harness at the server and the same database:
+
+    DATABASE_URL=sqlite:////tmp/load.db JWT_SECRET_KEY=bench python -m benchmarks.seed --listings 2000 --nights 20000
+    DATABASE_URL=sqlite:////tmp/load.db JWT_SECRET_KEY=bench RATE_LIMIT_BACKEND=none \
+        gunicorn -w 4 -b 127.0.0.1:8000 app:app
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --database-url sqlite:////tmp/load.db \
+        --concurrency 32 --duration 60 --mix browse=50,book=30,my_bookings=10,review=5,login=5
+
+The exit status is 1 if an invariant is violated.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import requests
+from sqlalchemy import and_, create_engine, func, select
+from sqlalchemy.orm import aliased
+
+from benchmarks.run import git_revision, summarize
+from benchmarks.seed import COUNTRIES, PASSWORD
+from models import Booking, Listing, ListingBookedRange
+
+SCENARIOS = ('browse', 'my_bookings', 'book', 'review', 'login')
+DEFAULT_MIX = 'browse=50,book=30,my_bookings=10,review=5,login=5'
+VIOLATION_SAMPLES = 10
+
+
+def parse_mix(value):
+    """'browse=50,book=30' -> {'browse': 50.0, 'book': 30.0}."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'Unknown scenario {name!r}; expected one of {", ".join(SCENARIOS)}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Invalid weight for {name!r}: {weight!r}')
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError('The mix needs at least one scenario with a positive weight')
+    return mix
+
+
+class Recorder:
+    """Latencies and statuses per scenario, shared by the worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(list)
+        self.exceptions = defaultdict(int)
+        self.created_bookings = 0
+
+    def record(self, scenario, seconds, status):
+        with self._lock:
+            self.latencies[scenario].append(seconds)
+            self.statuses[scenario].append(status)
+            if scenario == 'book' and status == 201:
+                self.created_bookings += 1
+
+    def failed(self, scenario):
+        with self._lock:
+            self.exceptions[scenario] += 1
+
+    def summary(self, elapsed):
+        results = {}
+        for scenario in SCENARIOS:
+            if self.latencies[scenario]:
+                results[scenario] = summarize(self.latencies[scenario], self.statuses[scenario], elapsed)
+                results[scenario]['error_rate'] = round(
+                    results[scenario]['errors'] / results[scenario]['requests'], 4)
+            if self.exceptions[scenario]:
+                results.setdefault(scenario, {})['connection_errors'] = self.exceptions[scenario]
+        return results
+
+
+class LoadTest:
+    def __init__(self, args, listings):
+        self.args = args
+        self.base = args.url.rstrip('/')
+        self.listings = listings  # [(id, availableFrom, availableTo)], hot listings first
+        self.hot = listings[:args.hot_listings]
+        self.recorder = Recorder()
+        self.tokens = {}  # guest email -> Authorization header
+        self.open_stays = defaultdict(list)  # guest email -> unreviewed stay ids
+        self._stays_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._local = threading.local()
+        self.scenarios, self.weights = zip(*((name, weight) for name, weight in args.mix.items() if weight > 0))
+
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, scenario, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session().request(method, self.base + path, timeout=self.args.timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.failed(scenario)
+            return None
+        self.recorder.record(scenario, time.perf_counter() - started, response.status_code)
+        return response
+
+    def login_guests(self):
+        emails = [f'guest{i}@bench.local' for i in range(self.args.guests)]
+        for email in emails:
+            response = requests.post(self.base + '/v1/auth/login', json={'email': email, 'password': self.args.password},
+                                     timeout=self.args.timeout)
+            if response.status_code != 200:
+                raise SystemExit(f'Login failed for {email}: {response.text}')
+            self.tokens[email] = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    # Scenarios; rnd is the calling thread's random.Random
+
+    def browse(self, rnd):
+        params = {'page': rnd.randint(1, 20), 'per_page': self.args.per_page}
+        if rnd.random() < 0.5:
+            country = rnd.choice(list(COUNTRIES))
+            params.update(country=country, city=rnd.choice(COUNTRIES[country]))
+        if rnd.random() < 0.3:
+            start, end = self.nights(rnd, rnd.choice(self.listings))
+            params.update(dateFrom=start.isoformat(), dateTo=end.isoformat())
+        self.send('browse', 'GET', '/v1/listing/listings', params=params)
+
+    def my_bookings(self, rnd):
+        email = rnd.choice(list(self.tokens))
+        response = self.send('my_bookings', 'GET', '/v1/booking/get_bookings',
+                             params={'fields': 'stay_id,reviewed'}, headers=self.tokens[email])
+        if response is not None and response.status_code == 200:
+            stays = [booking['stay_id'] for booking in response.json()['bookings'] if not booking['reviewed']]
+            with self._stays_lock:
+                self.open_stays[email] = stays
+
+    def book(self, rnd):
+        email = rnd.choice(list(self.tokens))
+        listing = rnd.choice(self.hot) if self.hot and rnd.random() < self.args.hot_share else rnd.choice(self.listings)
+        start, end = self.nights(rnd, listing, hot=listing in self.hot)
+        body = {'listing_id': listing[0], 'dateFrom': start.isoformat(), 'dateTo': end.isoformat(),
+                'namesOfPeople': 'Load Guest'}
+        self.send('book', 'POST', '/v1/booking/insert_booking', json=body, headers=self.tokens[email])
+
+    def review(self, rnd):
+        email = rnd.choice(list(self.tokens))
+        with self._stays_lock:
+            stay_id = self.open_stays[email].pop() if self.open_stays[email] else None
+        if stay_id is None:
+            # Nothing known to review yet; look the guest's stays up instead
+            self.my_bookings(rnd)
+            return
+        body = {'stay_id': stay_id, 'rating': rnd.randint(1, 5), 'comment': 'Load review'}
+        self.send('review', 'POST', '/v1/review/insert_review', json=body, headers=self.tokens[email])
+
+    def login(self, rnd):
+        body = {'email': rnd.choice(list(self.tokens)), 'password': self.args.password}
+        self.send('login', 'POST', '/v1/auth/login', json=body)
+
+    def nights(self, rnd, listing, hot=False):
+        _, available_from, available_to = listing
+        window = (available_to - available_from).days
+        if hot:
+            window = min(window, self.args.hot_days)
+        start = available_from + timedelta(days=rnd.randrange(0, window + 1))
+        return start, min(start + timedelta(days=rnd.randrange(0, self.args.max_nights)), available_to)
+
+    def worker(self, index, deadline, remaining):
+        rnd = random.Random(self.args.seed + index)
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                with self._count_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+            getattr(self, rnd.choices(self.scenarios, self.weights)[0])(rnd)
+
+    def run(self):
+        deadline = time.perf_counter() + self.args.duration
+        remaining = [self.args.requests] if self.args.requests else None
+        threads = [threading.Thread(target=self.worker, args=(index, deadline, remaining), daemon=True)
+                   for index in range(self.args.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+
+def load_listings(engine):
+    """Listings with their availability windows; the hot ones are the first ids."""
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(
+            select(Listing.id, Listing.availableFrom, Listing.availableTo).order_by(Listing.id)
+        )]
+
+
+def max_booking_id(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.max(Booking.id))).scalar() or 0
+
+
+def check_invariants(engine, first_booking_id, created_bookings):
+    """Returns {check: {'count': n, 'samples': [...]}}; every count should be 0."""
+    other = aliased(Booking)
+    other_range = aliased(ListingBookedRange)
+    checks = {
+        # Inclusive ranges: two stays clash when each starts on or before the other ends
+        'double_booked_nights': select(Booking.listing_id, Booking.id, other.id).join(other, and_(
+            other.listing_id == Booking.listing_id, other.id > Booking.id,
+            other.date_from <= Booking.date_to, Booking.date_from <= other.date_to,
+        )),
+        'overlapping_booked_ranges': select(
+            ListingBookedRange.listing_id, ListingBookedRange.id, other_range.id
+        ).join(other_range, and_(
+            other_range.listing_id == ListingBookedRange.listing_id, other_range.id > ListingBookedRange.id,
+            other_range.date_from <= ListingBookedRange.date_to, ListingBookedRange.date_from <= other_range.date_to,
+        )),
+        'bookings_outside_booked_ranges': select(Booking.listing_id, Booking.id).where(~select(ListingBookedRange.id).where(
+            ListingBookedRange.listing_id == Booking.listing_id,
+            ListingBookedRange.date_from <= Booking.date_from, ListingBookedRange.date_to >= Booking.date_to,
+        ).exists()),
+        'bookings_outside_availability': select(Booking.listing_id, Booking.id).join(
+            Listing, Listing.id == Booking.listing_id
+        ).where((Booking.date_from < Listing.availableFrom) | (Booking.date_to > Listing.availableTo)),
+    }
+    results = {}
+    with engine.connect() as connection:
+        for name, statement in checks.items():
+            count = connection.execute(select(func.count()).select_from(statement.subquery())).scalar()
+            samples = connection.execute(statement.limit(VIOLATION_SAMPLES)).all() if count else []
+            results[name] = {'count': count, 'samples': [list(row) for row in samples]}
+        new_bookings = connection.execute(
+            select(func.count()).select_from(Booking).where(Booking.id > first_booking_id)
+        ).scalar()
+    results['new_bookings_vs_201'] = {
+        'count': abs(new_bookings - created_bookings),
+        'samples': [{'new_rows': new_bookings, 'created_responses': created_bookings}],
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'),
+                        help="The server's database, for listing windows and the invariant check "
+                             '(default: DATABASE_URL)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client threads')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests, if sooner')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Scenario weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--guests', type=int, default=50, help='Seeded guest accounts to log in and book with')
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--hot-listings', type=int, default=5, help='Listings that get --hot-share of the bookings')
+    parser.add_argument('--hot-share', type=float, default=0.8)
+    parser.add_argument('--hot-days', type=int, default=14, help='Days at the start of a hot listing that are booked')
+    parser.add_argument('--max-nights', type=int, default=3, help='Longest stay requested')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--output', default='loadtest_results.json')
+    parser.add_argument('--seed', type=int, default=4458)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url (or DATABASE_URL) is required for the invariant check')
+
+    engine = create_engine(args.database_url)
+    listings = load_listings(engine)
+    if not listings:
+        raise SystemExit('The database has no listings; seed it with python -m benchmarks.seed first.')
+    first_booking_id = max_booking_id(engine)
+
+    test = LoadTest(args, listings)
+    test.login_guests()
+    elapsed = test.run()
+    results = test.recorder.summary(elapsed)
+
+    total = sum(len(latencies) for latencies in test.recorder.latencies.values())
+    print(f'{total} requests in {elapsed:.1f} s ({total / elapsed:.1f} rps) with {args.concurrency} threads')
+    for name, result in results.items():
+        if 'requests' in result:
+            print(f'{name:<12}{result["throughput_rps"]:>9} rps  p50 {result["p50_ms"]:>9} ms  '
+                  f'p90 {result["p90_ms"]:>9} ms  p99 {result["p99_ms"]:>9} ms  '
+                  f'errors {result["errors"]} ({result["error_rate"]:.1%})  statuses {result["statuses"]}')
+        if result.get('connection_errors'):
+            print(f'{name:<12}connection errors {result["connection_errors"]}')
+
+    invariants = check_invariants(engine, first_booking_id, test.recorder.created_bookings)
+    violated = {name: check for name, check in invariants.items() if check['count']}
+    for name, check in invariants.items():
+        print(f'{name:<32}{"FAIL" if check["count"] else "ok":>6}  {check["count"]}')
+        for sample in check['samples'] if check['count'] else ():
+            print(f'{"":<34}{sample}')
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'url': args.url,
+            'args': {**vars(args), 'database_url': engine.url.render_as_string(hide_password=True)},
+            'seconds': round(elapsed, 2),
+        },
+        'results': results,
+        'invariants': invariants,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2, default=str)
+    print(f'Results written to {args.output}')
+    if violated:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
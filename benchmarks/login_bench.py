@@ -0,0 +1,71 @@
+"""
+Login (password verification) throughput for candidate hash methods.
+
+Simulates a burst of concurrent logins going through services.passwords and
+reports throughput and latency percentiles per method, to pick a
+PASSWORD_HASH_METHOD and PASSWORD_HASH_WORKERS that meet the p99 target.
+
+Run from the repository root:
+    python -m benchmarks.login_bench --methods pbkdf2:sha256:600000 scrypt:32768:8:1 \
+        --workers 2 --concurrency 8 --logins 64
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from services import passwords
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(method, workers, concurrency, logins):
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_WORKERS=workers)
+    stored = generate_password_hash('correct horse battery staple', method)
+
+    def login(_):
+        with app.app_context():
+            started = time.perf_counter()
+            passwords.verify_password(stored, 'correct horse battery staple')
+            return time.perf_counter() - started
+
+    with app.app_context():
+        passwords.verify_password(stored, 'warm up the pool')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        latencies = list(clients.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'method': method,
+        'logins_per_s': logins / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=['pbkdf2:sha256', 'pbkdf2:sha256:600000', 'scrypt:32768:8:1'])
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS (0 = inline)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent login requests')
+    parser.add_argument('--logins', type=int, default=64, help='Logins per method')
+    args = parser.parse_args()
+
+    print(f'{"method":<26}{"logins/s":>10}{"p50 ms":>10}{"p99 ms":>10}')
+    for method in args.methods:
+        result = run(method, args.workers, args.concurrency, args.logins)
+        print(f'{result["method"]:<26}{result["logins_per_s"]:>10.1f}{result["p50_ms"]:>10.1f}{result["p99_ms"]:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
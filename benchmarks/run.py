@@ -0,0 +1,232 @@
+"""
+Endpoint benchmark suite.
+
+Builds the real app with create_app() against a local database, seeds it
+with synthetic data (benchmarks.seed), and drives the endpoints in-process
+through the Flask test client. Results (throughput and latency percentiles
+per scenario, plus app startup time) are written as JSON so runs can be
+compared:
+
+    python -m benchmarks.run --db /tmp/bench.db --listings 100000 --nights 1000000 \
+        --output results.json
+    python -m benchmarks.run --db /tmp/bench.db --output after.json --compare results.json
+
+An existing database file is reused, so it is only seeded once.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, statuses, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status >= 500),
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def measure(requests):
+    """Run (callable) requests one after another; each returns a response."""
+    latencies = []
+    statuses = []
+    started = time.perf_counter()
+    for send in requests:
+        request_started = time.perf_counter()
+        response = send()
+        latencies.append(time.perf_counter() - request_started)
+        statuses.append(response.status_code)
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def login(client, email, password):
+    response = client.post('/v1/auth/login', json={'email': email, 'password': password})
+    if response.status_code != 200:
+        raise SystemExit(f'Login failed for {email}: {response.get_json()}')
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+
+
+def scenarios(app, accounts, args, rnd):
+    from sqlalchemy import select
+
+    from benchmarks.seed import COUNTRIES, SEASON_DAYS, SEASON_START
+    from models import db, Booking, Listing, Review, User
+
+    client = app.test_client()
+    guest = login(client, accounts['guest_email'], accounts['password'])
+    admin = login(client, accounts['admin_email'], accounts['password'])
+
+    with app.app_context():
+        listing_ids = db.session.execute(select(Listing.id)).scalars().all()
+        guest_id = db.session.execute(
+            select(User.id).where(User.email == accounts['guest_email'])
+        ).scalar()
+
+    def open_stays():
+        """Unreviewed stays of the guest, including the ones insert_booking just created."""
+        with app.app_context():
+            return db.session.execute(
+                select(Booking.id).where(
+                    Booking.issuer_guest_id == guest_id,
+                    Booking.id.not_in(select(Review.stay_id))
+                )
+            ).scalars().all()
+
+    def listings_request():
+        params = {'page': rnd.randint(1, 50), 'per_page': args.per_page}
+        if rnd.random() < 0.5:
+            country = rnd.choice(list(COUNTRIES))
+            params.update(country=country, city=rnd.choice(COUNTRIES[country]))
+        if rnd.random() < 0.3:
+            start = SEASON_START + timedelta(days=rnd.randrange(0, SEASON_DAYS - 10))
+            params.update(dateFrom=start.isoformat(), dateTo=(start + timedelta(days=3)).isoformat())
+        return lambda: client.get('/v1/listing/listings', query_string=params)
+
+    def booking_request():
+        start = SEASON_START + timedelta(days=rnd.randrange(0, SEASON_DAYS - 10))
+        body = {
+            'listing_id': rnd.choice(listing_ids),
+            'dateFrom': start.isoformat(),
+            'dateTo': (start + timedelta(days=rnd.randrange(0, 5))).isoformat(),
+            'namesOfPeople': 'Bench Guest',
+        }
+        return lambda: client.post('/v1/booking/insert_booking', json=body, headers=guest)
+
+    def review_request(stay_id):
+        body = {'stay_id': stay_id, 'rating': rnd.randint(1, 5), 'comment': 'Bench review'}
+        return lambda: client.post('/v1/review/insert_review', json=body, headers=guest)
+
+    def login_request():
+        body = {'email': accounts['guest_email'], 'password': accounts['password']}
+        return lambda: client.post('/v1/auth/login', json=body)
+
+    def report_request():
+        params = {'country': rnd.choice(list(COUNTRIES))}
+        return lambda: client.get('/v1/report/report_listings', query_string=params, headers=admin)
+
+    # Built lazily and run in this order: insert_review reviews the stays insert_booking made
+    return {
+        'listings': lambda: [listings_request() for _ in range(args.requests)],
+        'insert_booking': lambda: [booking_request() for _ in range(args.requests)],
+        'insert_review': lambda: [review_request(stay_id) for stay_id in open_stays()[:args.requests]],
+        'login': lambda: [login_request() for _ in range(args.login_requests)],
+        'report_listings': lambda: [report_request() for _ in range(args.report_requests)],
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    print(f'\n{"scenario":<18}{"p50 ms (old -> new)":>26}{"p99 ms (old -> new)":>26}{"rps change":>12}')
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        rps_change = (new['throughput_rps'] / old['throughput_rps'] - 1) * 100 if old['throughput_rps'] else 0
+        print(f'{name:<18}{old["p50_ms"]:>12.2f} -> {new["p50_ms"]:<10.2f}'
+              f'{old["p99_ms"]:>12.2f} -> {new["p99_ms"]:<10.2f}{rps_change:>+11.1f}%')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='bench.db', help='SQLite database file (created and seeded if missing)')
+    parser.add_argument('--listings', type=int, default=10000)
+    parser.add_argument('--nights', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--login-requests', type=int, default=20, help='Logins (each one hashes a password)')
+    parser.add_argument('--report-requests', type=int, default=20)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--scenarios', nargs='+', help='Only run these scenarios')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--seed', type=int, default=4458)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-that-is-long-enough')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # One benchmark user sends far more than a client budget allows
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'none')
+
+    started = time.perf_counter()
+    from app import create_app
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app = create_app()
+    startup_seconds = time.perf_counter() - started
+
+    from benchmarks.seed import PASSWORD, is_seeded, seed
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+        if is_seeded():
+            accounts = {'admin_email': 'admin@bench.local', 'guest_email': 'guest0@bench.local', 'password': PASSWORD}
+            data = None
+        else:
+            started = time.perf_counter()
+            accounts = data = seed(args.listings, args.nights, password_method=app.config['PASSWORD_HASH_METHOD'],
+                                   random_seed=args.seed)
+            data['seconds'] = round(time.perf_counter() - started, 2)
+            print(f'Seeded: {data}')
+
+    rnd = random.Random(args.seed)
+    results = {}
+    for name, build_requests in scenarios(app, accounts, args, rnd).items():
+        if args.scenarios and name not in args.scenarios:
+            continue
+        requests = build_requests()
+        if not requests:
+            continue
+        results[name] = measure(requests)
+        print(f'{name:<18}{results[name]["throughput_rps"]:>10} rps  p50 {results[name]["p50_ms"]:>9} ms  '
+              f'p99 {results[name]["p99_ms"]:>9} ms  errors {results[name]["errors"]}')
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'database': os.environ['DATABASE_URL'],
+            'seeded': data,
+            'args': vars(args),
+            'import_seconds': round(import_seconds, 4),
+            'startup_seconds': round(startup_seconds, 4),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2, default=str)
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Synthetic data generator for benchmarks.
+
+Fills users, listings, bookings, booked ranges, reviews and the rating
+aggregates with reproducible random data. Everything is inserted in
+executemany batches. Call seed() inside an app context on an empty
+database, or run it standalone against DATABASE_URL:
+
+    DATABASE_URL=sqlite:///bench.db JWT_SECRET_KEY=bench \
+        python -m benchmarks.seed --listings 100000 --nights 1000000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+
+from models import db, Booking, Listing, ListingBookedDates, ListingBookedRange, Review, User
+from services import availability, ratings
+
+BATCH_SIZE = 5000
+PASSWORD = 'bench-password'
+COUNTRIES = {
+    'Turkey': ['Izmir', 'Istanbul', 'Ankara', 'Antalya', 'Bodrum'],
+    'UAE': ['Dubai', 'Abu Dhabi', 'Sharjah'],
+    'Greece': ['Athens', 'Thessaloniki', 'Heraklion', 'Rhodes'],
+    'Italy': ['Rome', 'Milan', 'Naples', 'Florence', 'Venice'],
+    'Spain': ['Madrid', 'Barcelona', 'Seville', 'Valencia'],
+}
+SEASON_START = date(2025, 1, 1)
+SEASON_DAYS = 365
+
+
+def _insert_batches(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def seed(listings=10000, nights=100000, hosts=200, guests=2000, review_ratio=0.3,
+         legacy_dates=False, password_method='pbkdf2:sha256', random_seed=4458):
+    """
+    Generate about ``nights`` booked nights spread over ``listings`` listings.
+    Returns a summary with the ids benchmarks need (an admin, a guest, ...).
+    """
+    rnd = random.Random(random_seed)
+    password_hash = generate_password_hash(PASSWORD, password_method)
+
+    users = [{'name': 'Bench Admin', 'email': 'admin@bench.local', 'password': password_hash, 'role': 'admin'}]
+    users += [{'name': f'Host {i}', 'email': f'host{i}@bench.local', 'password': password_hash, 'role': 'host'}
+              for i in range(hosts)]
+    users += [{'name': f'Guest {i}', 'email': f'guest{i}@bench.local', 'password': password_hash, 'role': 'guest'}
+              for i in range(guests)]
+    _insert_batches(User, users)
+
+    user_ids = dict(db.session.execute(select(User.email, User.id)).all())
+    host_ids = [user_ids[f'host{i}@bench.local'] for i in range(hosts)]
+    guest_ids = [user_ids[f'guest{i}@bench.local'] for i in range(guests)]
+
+    countries = list(COUNTRIES)
+    listing_rows = []
+    for i in range(listings):
+        country = rnd.choice(countries)
+        available_from = SEASON_START + timedelta(days=rnd.randrange(0, 60))
+        available_to = available_from + timedelta(days=rnd.randrange(60, SEASON_DAYS - 60))
+        row = {
+            'user_id': rnd.choice(host_ids),
+            'title': f'Listing {i}',
+            'numberOfPeople': rnd.randint(1, 12),
+            'country': country,
+            'city': rnd.choice(COUNTRIES[country]),
+            'price': round(rnd.uniform(20, 600), 2),
+            'availableFrom': available_from,
+            'availableTo': available_to,
+        }
+        row['content_hash'] = Listing.compute_content_hash(**row)
+        listing_rows.append(row)
+    _insert_batches(Listing, listing_rows)
+
+    listing_ids = db.session.execute(select(Listing.id).order_by(Listing.id)).scalars().all()
+    windows = dict(zip(listing_ids, ((row['availableFrom'], row['availableTo']) for row in listing_rows)))
+
+    # Non-overlapping stays per listing until the requested number of nights is reached
+    booking_rows = []
+    booked = {listing_id: [] for listing_id in listing_ids}
+    booked_nights = 0
+    attempts = 0
+    while booked_nights < nights and attempts < nights * 4:
+        attempts += 1
+        listing_id = rnd.choice(listing_ids)
+        available_from, available_to = windows[listing_id]
+        start = available_from + timedelta(days=rnd.randrange(0, (available_to - available_from).days))
+        end = min(start + timedelta(days=rnd.randrange(0, 7)), available_to)
+        if availability.overlaps(booked[listing_id], start, end):
+            continue
+        booked[listing_id] = availability.merge_ranges(booked[listing_id] + [(start, end)])
+        booking_rows.append({
+            'listing_id': listing_id,
+            'issuer_guest_id': rnd.choice(guest_ids),
+            'date_from': start,
+            'date_to': end,
+            'names_of_people': 'Bench Guest',
+            'amountOfPeople': 1,
+        })
+        booked_nights += (end - start).days + 1
+    _insert_batches(Booking, booking_rows)
+
+    _insert_batches(ListingBookedRange, [
+        {'listing_id': listing_id, 'date_from': start, 'date_to': end}
+        for listing_id, ranges in booked.items() for start, end in ranges
+    ])
+    if legacy_dates:
+        _insert_batches(ListingBookedDates, [
+            {'listing_id': row['listing_id'], 'booked_date': row['date_from'] + timedelta(days=offset)}
+            for row in booking_rows for offset in range((row['date_to'] - row['date_from']).days + 1)
+        ])
+
+    bookings = db.session.execute(select(Booking.id, Booking.issuer_guest_id)).all()
+    reviewed = rnd.sample(bookings, int(len(bookings) * review_ratio))
+    _insert_batches(Review, [
+        {'stay_id': booking_id, 'guest_id': guest_id, 'rating': rnd.randint(1, 5), 'comment': 'Bench review'}
+        for booking_id, guest_id in reviewed
+    ])
+    ratings.reconcile(fix=True)
+
+    return {
+        'users': len(users),
+        'listings': len(listing_rows),
+        'bookings': len(booking_rows),
+        'booked_nights': booked_nights,
+        'reviews': len(reviewed),
+        'admin_email': 'admin@bench.local',
+        'host_email': 'host0@bench.local',
+        'guest_email': 'guest0@bench.local',
+        'password': PASSWORD,
+    }
+
+
+def is_seeded():
+    return db.session.execute(select(func.count()).select_from(Listing)).scalar() > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listings', type=int, default=10000)
+    parser.add_argument('--nights', type=int, default=100000, help='Total booked nights to generate')
+    parser.add_argument('--hosts', type=int, default=200)
+    parser.add_argument('--guests', type=int, default=2000)
+    parser.add_argument('--review-ratio', type=float, default=0.3, help='Share of bookings that get a review')
+    parser.add_argument('--legacy-dates', action='store_true', help='Also fill the per-night listingBookedDates table')
+    parser.add_argument('--seed', type=int, default=4458)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if is_seeded():
+            raise SystemExit('Database already has listings; seed an empty database.')
+        summary = seed(args.listings, args.nights, args.hosts, args.guests, args.review_ratio,
+                       args.legacy_dates, app.config['PASSWORD_HASH_METHOD'], args.seed)
+    print(summary)
+
+
+if __name__ == '__main__':
+    main()
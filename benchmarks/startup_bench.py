@@ -0,0 +1,65 @@
+"""
+Worker cold start and first-request latency.
+
+Each run starts a fresh interpreter that imports app (which builds the app
+at module level, like a gunicorn worker does) and then sends its first and
+second request to /v1/listing/listings. Medians over the runs are printed.
+Tables are created once up front, as `flask init-db` would.
+
+Run from the repository root:
+    python -m benchmarks.startup_bench --runs 10
+    python -m benchmarks.startup_bench --runs 10 --env DB_CREATE_ALL=true   # old behaviour
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = r'''
+import json, time
+started = time.perf_counter()
+import app
+booted = time.perf_counter()
+client = app.app.test_client()
+timings = []
+for _ in range(2):
+    request_started = time.perf_counter()
+    status = client.get('/v1/listing/listings').status_code
+    timings.append(time.perf_counter() - request_started)
+print(json.dumps({'boot': booted - started, 'first': timings[0], 'second': timings[1], 'status': status}))
+'''
+
+
+def run_once(env):
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--db', help='SQLite database file (default: a temporary one)')
+    parser.add_argument('--env', nargs='*', default=[], help='Extra NAME=value settings for the workers')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'startup.db')
+    env = dict(os.environ)
+    env.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-that-is-long-enough')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    env['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    env.update(setting.split('=', 1) for setting in args.env)
+
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], env=env, check=True,
+                   capture_output=True)
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    for name in ('boot', 'first', 'second'):
+        median_ms = statistics.median(run[name] for run in runs) * 1000
+        print(f'{name + " (ms)":<14}{median_ms:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
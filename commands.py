@@ -0,0 +1,74 @@
+import click
+from flask.cli import AppGroup
+
+from models import db
+from services import availability, idempotency, listings, ratings, report_jobs
+
+availability_cli = AppGroup('availability', help='Manage listing availability data.')
+idempotency_cli = AppGroup('idempotency', help='Manage stored Idempotency-Key results.')
+listings_cli = AppGroup('listings', help='Manage listings.')
+ratings_cli = AppGroup('ratings', help='Manage listing rating aggregates.')
+reports_cli = AppGroup('reports', help='Manage background report jobs.')
+
+
+@click.command('init-db')
+def init_db():
+    """Create missing tables. Existing tables are not altered."""
+    db.create_all()
+    click.echo('Database tables created.')
+
+
+@availability_cli.command('migrate')
+@click.option('--batch-size', default=500, show_default=True, help='Listings migrated per transaction.')
+def migrate_availability(batch_size):
+    """Fold listingBookedDates rows into merged listingBookedRanges."""
+    listings, ranges = availability.migrate_booked_dates(batch_size=batch_size)
+    click.echo(f'Migrated {listings} listings into {ranges} booked ranges.')
+
+
+@ratings_cli.command('reconcile')
+@click.option('--fix', is_flag=True, help='Rewrite drifted aggregates from the reviews table.')
+def reconcile_ratings(fix):
+    """Check listingRatings against reviews, and optionally rebuild it."""
+    drift = ratings.reconcile(fix=fix)
+    for listing_id, stored, expected in drift:
+        click.echo(f'listing {listing_id}: stored={stored} expected={expected}')
+    if not drift:
+        click.echo('Rating aggregates are in sync.')
+    elif fix:
+        click.echo(f'Fixed {len(drift)} listings.')
+    else:
+        click.echo(f'{len(drift)} listings drifted. Re-run with --fix to rebuild them.')
+
+
+@listings_cli.command('backfill-hash')
+@click.option('--batch-size', default=1000, show_default=True, help='Listings updated per transaction.')
+def backfill_listing_hashes(batch_size):
+    """Compute content_hash for listings created before duplicate hashing."""
+    updated = listings.backfill_content_hashes(batch_size=batch_size)
+    click.echo(f'Backfilled content hashes for {updated} listings.')
+
+
+@idempotency_cli.command('purge')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows deleted per transaction.')
+def purge_idempotency_keys(batch_size):
+    """Delete expired Idempotency-Key results."""
+    deleted = idempotency.purge_expired(batch_size=batch_size)
+    click.echo(f'Deleted {deleted} expired idempotency keys.')
+
+
+@reports_cli.command('purge')
+@click.option('--older-than-hours', default=24, show_default=True, help='Age of the finished jobs to delete.')
+def purge_report_jobs(older_than_hours):
+    """Fail stale report jobs, then delete old finished ones and their result files."""
+    deleted = report_jobs.purge(older_than_hours)
+    click.echo(f'Deleted {deleted} report jobs.')
+
+
+def register_commands(app):
+    app.cli.add_command(init_db)
+    app.cli.add_command(availability_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(listings_cli)
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(reports_cli)
@@ -0,0 +1,31 @@
+"""
+gunicorn settings, read from the working directory both by the Docker image
+and by Azure App Service's default `gunicorn app:app` startup command.
+
+Missing tables are created once per start, in the master before any worker
+is forked (what `flask init-db` does), so a deploy never runs against a
+database without the tables its code needs, and the workers still boot
+without touching the database. Set DB_INIT_ON_START=false where the schema
+is managed separately.
+
+Each worker starts its password hashing pool right after the fork, while
+it still has a single thread (see services/passwords.py).
+"""
+import os
+
+
+def on_starting(server):
+    from app import app, parse_flag
+    from models import db
+
+    if parse_flag(os.getenv('DB_INIT_ON_START', 'true')):
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()  # Don't hand this connection to forked workers
+
+
+def post_fork(server, worker):
+    from app import app
+    from services import passwords
+
+    passwords.warm_up(app.config)
@@ -1,9 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from services.replica import RoutingSession
+
+# RoutingSession sends reads in @read_replica views to the 'replica' bind, if configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 from .user import User
 from .listing import Listing
 from .booking import Booking
 from .review import Review
 from .listingBookedDates import ListingBookedDates
+from .listingBookedRange import ListingBookedRange
+from .listingRating import ListingRating
+from .changeCounter import ChangeCounter
+from .idempotencyKey import IdempotencyKey
+from .reportJob import ReportJob
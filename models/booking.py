@@ -1,5 +1,5 @@
 from . import db
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
@@ -10,3 +10,8 @@ class Booking(db.Model):
     date_to = db.Column(Date, nullable=False)
     names_of_people = db.Column(String(250), nullable=False)
     amountOfPeople = db.Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Backs GET /get_bookings: a guest's bookings, filtered by date
+        Index('ix_bookings_guest_date_from', 'issuer_guest_id', 'date_from'),
+    )
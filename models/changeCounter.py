@@ -0,0 +1,12 @@
+from . import db
+from sqlalchemy import BigInteger, Column, String
+
+
+class ChangeCounter(db.Model):
+    """
+    Named counters bumped by writes, used as cheap version stamps for
+    conditional GETs (see services/versions.py).
+    """
+    __tablename__ = 'changeCounters'
+    name = db.Column(String(64), primary_key=True)
+    version = db.Column(BigInteger, nullable=False, default=0)
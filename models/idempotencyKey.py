@@ -0,0 +1,23 @@
+from . import db
+from sqlalchemy import Column, DateTime, Index, Integer, String, UnicodeText
+
+
+class IdempotencyKey(db.Model):
+    """
+    First responses of POST requests sent with an Idempotency-Key header,
+    replayed to retries (see services/idempotency.py). Expired rows are
+    removed by `flask idempotency purge`.
+    """
+    __tablename__ = 'idempotencyKeys'
+    # sha256 of the user, route and key
+    id = db.Column(String(64), primary_key=True)
+    # sha256 of the request body, to reject a key reused for a different request
+    request_hash = db.Column(String(64), nullable=False)
+    # NULL while the first request is still running
+    status_code = db.Column(Integer, nullable=True)
+    body = db.Column(UnicodeText, nullable=True)
+    expires_at = db.Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_idempotencyKeys_expires_at', 'expires_at'),
+    )
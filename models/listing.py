@@ -1,5 +1,7 @@
+import hashlib
+
 from . import db
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, CheckConstraint, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, CheckConstraint, Date, Index
 
 class Listing(db.Model):
     __tablename__ = 'listings'
@@ -16,7 +18,33 @@ class Listing(db.Model):
     price = db.Column(Float, nullable=False)
     availableFrom = db.Column(Date, nullable=False)
     availableTo = db.Column(Date, nullable=False)
+    # sha256 of the listing's attributes, used for duplicate detection
+    content_hash = db.Column(String(64), nullable=True)
+
+    __table_args__ = (
+        # Backs the search filters on GET /listings
+        Index('ix_listings_location_people', 'country', 'city', 'numberOfPeople'),
+        Index('ix_listings_availability', 'availableFrom', 'availableTo'),
+        Index('ix_listings_content_hash', 'content_hash'),
+    )
 
+    @staticmethod
+    def compute_content_hash(user_id, title, numberOfPeople, country, city, price, availableFrom, availableTo):
+        """
+        Hash of the attributes that make two listings duplicates. Text is
+        compared case-insensitively, like the database's default collation.
+        """
+        parts = [
+            str(int(user_id)),
+            (title or '').strip().lower(),
+            str(int(numberOfPeople)),
+            country.strip().lower(),
+            city.strip().lower(),
+            repr(float(price)),
+            availableFrom.isoformat(),
+            availableTo.isoformat(),
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
 
     def to_dict(self):
         return {
@@ -0,0 +1,18 @@
+from . import db
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
+
+
+class ListingBookedRange(db.Model):
+    """
+    Booked nights of a listing stored as merged, non-overlapping date ranges.
+    Both ends are inclusive, and adjacent ranges are merged into one row.
+    """
+    __tablename__ = 'listingBookedRanges'
+    id = db.Column(Integer, primary_key=True, autoincrement=True)
+    listing_id = db.Column(Integer, ForeignKey('listings.id'), nullable=False)
+    date_from = db.Column(Date, nullable=False)
+    date_to = db.Column(Date, nullable=False)
+
+    __table_args__ = (
+        Index('ix_listingBookedRanges_listing_dates', 'listing_id', 'date_from', 'date_to'),
+    )
@@ -0,0 +1,27 @@
+from . import db
+from sqlalchemy import Column, Integer, ForeignKey
+
+
+class ListingRating(db.Model):
+    """
+    Running review aggregates per listing, maintained by insert_review.
+    Rebuild or check them with `flask ratings reconcile`.
+    """
+    __tablename__ = 'listingRatings'
+    listing_id = db.Column(Integer, ForeignKey('listings.id'), primary_key=True)
+    rating_sum = db.Column(Integer, nullable=False, default=0)
+    review_count = db.Column(Integer, nullable=False, default=0)
+    stars_1 = db.Column(Integer, nullable=False, default=0)
+    stars_2 = db.Column(Integer, nullable=False, default=0)
+    stars_3 = db.Column(Integer, nullable=False, default=0)
+    stars_4 = db.Column(Integer, nullable=False, default=0)
+    stars_5 = db.Column(Integer, nullable=False, default=0)
+
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 2)
+
+    def histogram(self):
+        return {str(stars): getattr(self, f'stars_{stars}') for stars in range(1, 6)}
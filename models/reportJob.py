@@ -0,0 +1,27 @@
+from . import db
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+
+class ReportJob(db.Model):
+    """
+    A listing report built in the background (see services/report_jobs.py).
+    The rows are written to REPORT_JOBS_DIR on the host that ran the job.
+    """
+    __tablename__ = 'reportJobs'
+    id = db.Column(String(32), primary_key=True)
+    user_id = db.Column(Integer, ForeignKey('users.id'), nullable=False)
+    # queued, running, done or failed
+    status = db.Column(String(16), nullable=False)
+    country = db.Column(String(128), nullable=True)
+    city = db.Column(String(128), nullable=True)
+    # Comma-separated report fields
+    fields = db.Column(String(250), nullable=False)
+    row_count = db.Column(Integer, nullable=True)
+    error = db.Column(String(500), nullable=True)
+    created_at = db.Column(DateTime, nullable=False)
+    started_at = db.Column(DateTime, nullable=True)
+    finished_at = db.Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_reportJobs_created_at', 'created_at'),
+    )
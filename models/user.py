@@ -12,3 +12,5 @@ class User(db.Model):
         CheckConstraint("role IN ('guest', 'host', 'admin')", name='role_check'),
         nullable=False, default='guest'
     )
+    # Bumped to revoke every access token issued to the user so far
+    token_version = db.Column(Integer, nullable=False, default=0, server_default='0')
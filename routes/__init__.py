@@ -2,6 +2,7 @@ from .auth import auth_bp
 from .listing import listing_bp
 from .booking import booking_bp
 from .report import report_bp
+from .report_jobs import report_jobs_bp
 from .review import review_bp
 
 def init_app(app):
@@ -11,3 +12,4 @@ def init_app(app):
     app.register_blueprint(booking_bp, url_prefix='/v1/booking')
     app.register_blueprint(review_bp, url_prefix='/v1/review')
     app.register_blueprint(report_bp, url_prefix='/v1/report')
+    app.register_blueprint(report_jobs_bp, url_prefix='/v1/report/jobs')
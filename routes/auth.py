@@ -1,12 +1,15 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from models import db, User
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from services.passwords import hash_password, verify_password, needs_rehash
+from services import ratelimit
+from services.tokens import token_claims, revoke_tokens
 
 auth_bp = Blueprint('auth', __name__)
 
 # added to frontend
 @auth_bp.route('/users', methods=['POST'])
+@ratelimit.budget('signup')
 def register():
     data = request.get_json()
     name = data.get('name')
@@ -20,7 +23,7 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({'message': f'User already exists on {email}'}), 400
 
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    hashed_password = hash_password(password)
 
     new_user = User(
         name=name,
@@ -38,6 +41,8 @@ def register():
 # added to frontend
 
 @auth_bp.route('/login', methods=['POST'])
+@ratelimit.budget('login')
+@ratelimit.budget('login_email', client=ratelimit.email_client)
 def login():
     data = request.get_json()
     email = data.get('email')
@@ -50,13 +55,32 @@ def login():
     if not user:
         return jsonify({'message': 'User does not exist'}), 400
 
-    if not check_password_hash(user.password, password):
+    if not verify_password(user.password, password):
         return jsonify({'message': 'Invalid password'}), 400
 
+    # Upgrade hashes made with an older algorithm or cost while we have the plain password
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.session.commit()
+
     from datetime import timedelta
-    access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(hours=24))
+    access_token = create_access_token(
+        identity=str(user.id),
+        additional_claims=token_claims(user),  # role and token version, read by require_role
+        expires_delta=timedelta(hours=24)
+    )
     return jsonify({
         'message': 'User logged in successfully',
         'access_token': access_token,
         'user': {'id': user.id, 'name': user.name, 'email': user.email, 'role': user.role}
     }), 200
+
+
+@auth_bp.route('/revoke_tokens', methods=['POST'])
+@jwt_required()
+def revoke_all_tokens():
+    """
+    Log the current user out everywhere by invalidating all of their tokens.
+    """
+    revoke_tokens(get_jwt_identity())
+    return jsonify({'message': 'All tokens revoked successfully'}), 200
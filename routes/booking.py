@@ -1,25 +1,28 @@
+import logging
+
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import IntegrityError
 
-from Decorators.decorators import require_role
-from models import db, Booking, ListingBookedDates, Listing
-from datetime import datetime, timedelta
+from Decorators.decorators import idempotent, read_replica, require_role
+from models import db, Booking, Listing
+from services import availability, bookings, metrics, versions
+from services.pagination import (
+    InvalidCursor, count_statement, cursor_meta, offset_meta, offset_statement, seek_result, seek_statement
+)
+from datetime import datetime
 
 booking_bp = Blueprint('booking', __name__)
+logger = logging.getLogger(__name__)
 
 @booking_bp.route('/insert_booking', methods=['POST'])
-@jwt_required()
 @require_role('guest')
+@idempotent
 
 def insert_booking():
-    print("insert_booking API called")  
-
     current_user_id = get_jwt_identity()
-    print(f"Current User ID: {current_user_id}")
-
     data = request.get_json()
-    print(f"Request Data: {data}")
+    logger.debug('insert_booking called', extra={'user_id': current_user_id, 'payload': data})
 
     required_fields = ['listing_id', 'dateFrom', 'dateTo', 'namesOfPeople']
     missing_fields = []
@@ -27,26 +30,31 @@ def insert_booking():
         if field not in data:
             missing_fields.append(field)
     if missing_fields:
-        print(f"Missing fields: {missing_fields}")
+        logger.info('Booking rejected: missing fields', extra={'missing_fields': missing_fields})
         return jsonify({'message': f'Missing required fields: {",".join(missing_fields)}'}), 400
 
     try:
         data['dateFrom'] = datetime.strptime(data['dateFrom'], '%Y-%m-%d').date()
         data['dateTo'] = datetime.strptime(data['dateTo'], '%Y-%m-%d').date()
-        print(f"Parsed Dates - From: {data['dateFrom']}, To: {data['dateTo']}")
     except ValueError:
-        print("Invalid date format in request")
+        logger.info('Booking rejected: invalid date format')
         return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD.'}), 400
 
-    listing = db.session.query(Listing).filter_by(id=data['listing_id']).first()
-    print(f"Listing Found: {listing}")
+    if data['dateFrom'] > data['dateTo']:
+        return jsonify({'message': 'dateFrom must be on or before dateTo.'}), 400
 
-    if not listing:
-        print("Listing does not exist")
+    # Lock the listing first: concurrent bookings of the same listing now queue up
+    # here, so the availability check below cannot be raced by another transaction.
+    if not availability.lock_listing(data['listing_id']):
+        db.session.rollback()
+        logger.info('Booking rejected: listing does not exist', extra={'listing_id': data['listing_id']})
         return jsonify({'message': 'Listing does not exist.'}), 400
 
+    listing = db.session.get(Listing, data['listing_id'])
+
     if not (listing.availableFrom <= data['dateFrom'] <= listing.availableTo) or not (listing.availableFrom <= data['dateTo'] <= listing.availableTo):
-        print(f"Booking dates out of range. Listing Available Range: {listing.availableFrom} to {listing.availableTo}")
+        db.session.rollback()
+        logger.info('Booking rejected: dates out of range', extra={'listing_id': listing.id})
         return jsonify({
             'message': 'Booking dates must be within the listing\'s availability range.',
             'available_range': {
@@ -55,29 +63,16 @@ def insert_booking():
             }
         }), 400
 
-    unavailable_dates = db.session.query(ListingBookedDates.booked_date).filter(
-        ListingBookedDates.listing_id == data['listing_id'],
-        ListingBookedDates.booked_date.between(data['dateFrom'], data['dateTo'])
-    ).all()
-    print(f"Unavailable Dates Found: {unavailable_dates}")
-
-    if unavailable_dates:
-        unavailable_dates_str = [date[0].strftime('%Y-%m-%d') for date in unavailable_dates]
-        print(f"Conflicting Unavailable Dates: {unavailable_dates_str}")
+    # Indexed range check; replaces the scan over every past booking of the listing
+    unavailable_ranges = availability.conflicting_ranges(data['listing_id'], data['dateFrom'], data['dateTo'])
+    if unavailable_ranges:
+        db.session.rollback()
+        logger.info('Booking rejected: dates not available', extra={'listing_id': listing.id})
         return jsonify({
             'message': 'Selected dates are not available for booking.',
-            'unavailable_dates': unavailable_dates_str
+            'unavailable_dates': availability.serialize_ranges(unavailable_ranges)
         }), 400
 
-    existing_bookings = db.session.query(Booking).filter(
-        Booking.listing_id == data['listing_id']
-    ).all()
-    print(f"Existing Bookings Found: {existing_bookings}")
-    for booking in existing_bookings:
-        if (data['dateFrom'] <= booking.date_to) and (data['dateTo'] >= booking.date_from):
-            print(f"Overlapping Booking Found: {booking}")
-            return jsonify({'message': 'Booking already exists on selected dates'}), 400
-
     try:
         # Create a new booking
         new_booking = Booking(
@@ -89,32 +84,19 @@ def insert_booking():
             amountOfPeople=data.get('amountOfPeople', 1)  # Default to 1 if not provided
         )
         db.session.add(new_booking)
-        print(f"New Booking Added: {new_booking}")  # Log new booking
-
-        # Generate all dates between bookStartDate and bookEndDate
-        bookStartDate = data['dateFrom']
-        bookEndDate = data['dateTo']
-        Dates = []
-        while bookStartDate <= bookEndDate:  # Include the end date
-            Dates.append(bookStartDate)
-            bookStartDate += timedelta(days=1)
-
-        print(f"Generated Booking Dates: {Dates}")  # Log generated dates
-
-        # Insert dates into the listingBookedDates table
-        bookedDatesbyListing = [
-            ListingBookedDates(
-                listing_id=data['listing_id'],
-                booked_date=date
-            )
-            for date in Dates
-        ]
-        db.session.add_all(bookedDatesbyListing)
-        print(f"Booked Dates Added: {bookedDatesbyListing}")  # Log booked dates
-
-        # Commit the transaction to the database
-        db.session.commit()
-        print("Transaction committed successfully")  # Log successful transaction
+
+        # Mark the nights as booked, merged with the listing's existing ranges
+        availability.book_range(data['listing_id'], data['dateFrom'], data['dateTo'])
+        versions.listings_changed()
+        booking_id = new_booking.id  # flushed above
+
+        # @idempotent commits the transaction, together with the stored response
+        db.session.flush()
+        logger.info('Booking inserted', extra={
+            'booking_id': booking_id,
+            'listing_id': listing.id,
+            'nights': (data['dateTo'] - data['dateFrom']).days + 1
+        })
 
         # Return a success message
         return jsonify({'message': 'Booking inserted successfully'}), 201
@@ -122,7 +104,7 @@ def insert_booking():
     except IntegrityError as e:
         # Handle database integrity errors (e.g., missing foreign key constraints)
         db.session.rollback()
-        print(f"Integrity Error: {str(e.orig)}")  # Log integrity error
+        logger.warning('Booking failed: integrity error', extra={'error': str(e.orig)})
         return jsonify({
             'message': 'Failed to insert booking. Please ensure the listing exists.',
             'error': str(e.orig)
@@ -131,33 +113,74 @@ def insert_booking():
     except Exception as e:
         # Handle any other unexpected exceptions
         db.session.rollback()
-        print(f"Unexpected Error: {str(e)}")  # Log unexpected error
+        logger.exception('Booking failed: unexpected error')
         return jsonify({'message': 'An unexpected error occurred.', 'error': str(e)}), 500
 
 
 
 @booking_bp.route('/get_bookings', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_bookings():
     """
-    Fetch all bookings for the currently logged-in user.
+    Fetch the bookings of the currently logged-in user, each with a summary
+    of its listing and whether it has been reviewed.
+
+    Query Parameters:
+        - status (str): upcoming (stays not yet over) or past
+        - dateFrom, dateTo (str): Only stays overlapping this range (YYYY-MM-DD); either may be given alone
+        - page (int): Opt in to offset pagination, newest bookings first
+        - cursor (str): Opt in to keyset pagination, newest bookings first. Pass an
+          empty value for the first page, then meta.next_cursor.
+        - per_page (int): Bookings per page when paginated (default: 10, max: 100)
+        - fields (str): Comma-separated attributes to return (default: all). The
+          listing join and the reviewed lookup only run when requested.
+
+    Without page or cursor every matching booking is returned, as before
+    pagination was added; the response size is then bounded only by the
+    user's bookings and the filters.
+
+    Responses carry a weak ETag; a matching If-None-Match gets 304 without
+    running the bookings query.
     """
     current_user_id = get_jwt_identity()
-
-    # Query bookings for the current user
-    bookings = Booking.query.filter_by(issuer_guest_id=current_user_id).all()
+    query, error = bookings.parse_query(request.args)
+    if error:
+        return jsonify({'message': error}), 400
+
+    # Stamp before querying: a write racing the query then only makes the ETag older
+    etag = versions.bookings_etag(current_user_id, query['today'])
+    not_modified = versions.not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Bookings of the current user with their listing summaries, in one query
+    statement = bookings.bookings_statement(current_user_id, query)
+
+    meta = None
+    per_page = query['per_page']
+    if query['cursor'] is not None:
+        try:
+            statement = seek_statement(statement, Booking.id, query['cursor'], per_page)
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        user_bookings, next_cursor = seek_result(db.session.execute(statement).all(), Booking.id, per_page)
+        meta = cursor_meta(per_page, next_cursor)
+    elif query['page'] is not None:
+        total = db.session.execute(count_statement(statement)).scalar()
+        statement = offset_statement(statement.order_by(Booking.id.desc()), query['page'], per_page)
+        user_bookings = db.session.execute(statement).all()
+        meta = offset_meta(query['page'], per_page, total)
+    else:
+        user_bookings = db.session.execute(statement).all()
 
     # Convert bookings to a list of dictionaries
-    booking_list = [
-        {
-            "stay_id": booking.id,
-            "listing_id": booking.listing_id,
-            "date_from": booking.date_from,
-            "date_to": booking.date_to,
-            "names_of_people": booking.names_of_people,
-            "amountOfPeople": booking.amountOfPeople
-        }
-        for booking in bookings
-    ]
-
-    return jsonify({"bookings": booking_list}), 200
+    booking_list = [bookings.serialize_booking(row, query['fields']) for row in user_bookings]
+    metrics.record_rows(len(booking_list))
+
+    if meta is not None:
+        response = jsonify({"bookings": booking_list, "meta": meta})
+    else:
+        response = jsonify({"bookings": booking_list})
+    response.set_etag(etag, weak=True)
+    return response, 200
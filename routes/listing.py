@@ -1,129 +1,200 @@
-from datetime import timedelta
+import io
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from jinja2.utils import missing
-from sqlalchemy import func
 
-from Decorators.decorators import require_role
-from models import db, Listing, ListingBookedDates, Review
+from Decorators.decorators import read_replica, require_role
+from models import db, Listing
+from services import availability, cache, listings, locations, metrics, ratelimit, ratings, replica, versions
+from services.pagination import (
+    InvalidCursor, count_statement, cursor_meta, offset_meta, offset_statement, seek_result, seek_statement
+)
 
 listing_bp = Blueprint('listing', __name__)
 
 @listing_bp.route('/insert_listing', methods=['POST'])
-@jwt_required()
 @require_role('host')
 
 def insert_listing():
     current_user_id = get_jwt_identity()
     data = request.get_json()
 
-    required_fields = ['numberOfPeople', 'country', 'city', 'price','availableFrom','availableTo']
     missing_fields = []
-    for field in required_fields:
+    for field in listings.REQUIRED_FIELDS:
         if field not in data:
             missing_fields.append(field)
     if missing_fields:
         return jsonify({'message': f'Missing required fields: {",".join(missing_fields)}'}), 400
 
-    # Check if a listing with the same attributes already exists
-    existing_listing = Listing.query.filter_by(
-        user_id=current_user_id,
-        title=data.get('title', '.'),
-        numberOfPeople=data.get('numberOfPeople', 1),
-        country=data['country'],
-        city=data['city'],
-        price=data['price'],
-        availableFrom=data['availableFrom'],
-        availableTo=data['availableTo']
-    ).first()
-
-    if existing_listing:
+    values, errors = listings.parse_listing(data, current_user_id)
+    if errors:
+        return jsonify({'message': ' '.join(errors)}), 400
+
+    # Check if a listing with the same attributes already exists (one indexed lookup)
+    if listings.listing_exists(values['content_hash']):
         return jsonify({'message': 'Listing already exists'}), 400
 
-    listing = Listing(
-        user_id=int(current_user_id),
-        title=data.get('title', '.'),
-        numberOfPeople=data.get('numberOfPeople', 1),
-        country=data['country'],
-        city=data['city'],
-        price=data['price'],
-        availableFrom=data['availableFrom'],
-        availableTo=data['availableTo'],
-    )
+    listing = Listing(**values)
     db.session.add(listing)
     db.session.commit()
+    locations.listing_added(values['country'], values['city'])
     return jsonify({'message': 'Listing inserted successfully'}), 201
 
+
+@listing_bp.route('/bulk', methods=['POST'])
+@require_role('host')
+def bulk_insert_listings():
+    """
+    Import many listings from a streamed request body.
+
+    Body: one listing per line as NDJSON (Content-Type: application/x-ndjson),
+    or CSV with a header row (Content-Type: text/csv), encoded as UTF-8. Rows
+    are validated and inserted in chunks, one transaction per chunk.
+
+    Returns:
+        A per-row report: created, duplicate, invalid with the errors, or
+        failed when the database rejected the row. A body that is not UTF-8
+        gets 400; chunks before the undecodable line stay imported.
+    """
+    current_user_id = get_jwt_identity()
+
+    if request.mimetype == 'text/csv':
+        rows = listings.read_csv(_body_lines())
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = listings.read_ndjson(_body_lines())
+    else:
+        return jsonify({'message': 'Content-Type must be application/x-ndjson or text/csv.'}), 415
+
+    try:
+        results = listings.import_listings(rows, current_user_id)
+    except UnicodeDecodeError:
+        return jsonify({'message': 'Request body must be UTF-8 encoded.'}), 400
+
+    summary = {'created': 0, 'duplicate': 0, 'invalid': 0, 'failed': 0}
+    for result in results:
+        summary[result['status']] += 1
+
+    return jsonify({
+        'message': 'Bulk import finished',
+        'summary': summary,
+        'results': results
+    }), 200
+
+
+@listing_bp.route('/locations', methods=['GET'])
+def get_locations():
+    """
+    Autocomplete countries and cities from the in-process location index.
+
+    Query Parameters:
+        - prefix (str): Start of a country or city name; case and accents are ignored
+        - limit (int): Maximum suggestions (default: 10, max: 50)
+
+    Returns:
+        Matching countries and cities with their listing counts, most listings first.
+    """
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = locations.MAX_RESULTS
+    prefix = request.args.get('prefix', default='', type=str)
+    limit = request.args.get('limit', default=DEFAULT_LIMIT, type=int)
+    if limit < 1 or limit > MAX_LIMIT:
+        return jsonify({'message': f'limit must be between 1 and {MAX_LIMIT}.'}), 400
+
+    return jsonify({'data': locations.get_index().search(prefix, limit)}), 200
+
+
+def _body_lines():
+    """Decode the request body line by line without buffering all of it."""
+    return io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+
 # added to frontend
 
 @listing_bp.route('/listings', methods=['GET'])
+@ratelimit.cost(lambda: listings.page_cost(request.args))
 @jwt_required(optional=True)
+@read_replica
 def get_listing():
     """
-    Retrieve a paginated list of listings, including unavailable dates and average ratings.
+    Retrieve a paginated list of listings, including unavailable date ranges and average ratings.
 
     Query Parameters:
         - page (int): Page number (default: 1)
         - per_page (int): Listings per page (default: 10, max: 100)
+        - cursor (str): Opt in to keyset pagination. Pass an empty value for the first
+          page, then meta.next_cursor. No total count is computed in this mode.
+        - dateFrom, dateTo (str): Only listings bookable for the whole range (YYYY-MM-DD)
+        - country (str): Filter by country
+        - city (str): Filter by city
+        - numberOfPeople (int): Only listings that accommodate at least this many people
+        - fields (str): Comma-separated attributes to return (default: all). The
+          unavailableDates and averageRating lookups only run when requested.
+
+    Responses are served from the listings response cache when possible
+    (X-Cache: HIT or MISS), as long as the version stamp they were built
+    under is still current, except for users kept on the primary right
+    after a write (see services/replica.py). Responses
+    carry a weak ETag; a matching If-None-Match gets 304 without running the
+    listing queries. Each request takes one rate-limit token per 10 listings
+    asked for (per_page).
 
     Returns:
         JSON response containing listings data and pagination metadata.
     """
-    DEFAULT_PAGE = 1
-    DEFAULT_PER_PAGE = 10
-    MAX_PER_PAGE = 100
-    page = request.args.get('page', default=DEFAULT_PAGE, type=int)
-    per_page = request.args.get('per_page', default=DEFAULT_PER_PAGE, type=int)
-    if page < 1:
-        return jsonify({'message': 'Page number must be 1 or greater.'}), 400
-    if per_page < 1 or per_page > MAX_PER_PAGE:
-        return jsonify({'message': f'per_page must be between 1 and {MAX_PER_PAGE}.'}), 400
-
-    query = Listing.query.order_by(Listing.id.desc())
-    paginated_listings = query.paginate(page=page, per_page=per_page, error_out=False)
-
-    listings_with_extra_data = []
-
-    for listing in paginated_listings.items:
-        # Fetch booked dates for the listing
-        booked_dates = db.session.query(ListingBookedDates.booked_date).filter(
-            ListingBookedDates.listing_id == listing.id
-        ).all()
-        booked_dates_set = set(date[0] for date in booked_dates)
-
-        # If all dates in the range are booked, skip this listing
-        if len(booked_dates_set) == (listing.availableTo - listing.availableFrom).days + 1:
-            continue
-
-        # Sort unavailable dates for readability
-        unavailable_dates = list(booked_dates_set)
-        unavailable_dates.sort()
-
-        # Calculate the average rating for the listing
-        average_rating = db.session.query(func.avg(Review.rating)).filter(
-            Review.stay_id == listing.id
-        ).scalar()
-
-        # Ensure average_rating is a float or 0 if no reviews
-        average_rating = round(average_rating, 2) if average_rating else 0.0
-
-        # Append listing with unavailable dates and average rating
-        listings_with_extra_data.append({
-            **listing.to_dict(),
-            'unavailableDates': unavailable_dates,
-            'averageRating': average_rating
-        })
-
-    meta = {
-        'page': paginated_listings.page,
-        'per_page': paginated_listings.per_page,
-        'total_pages': paginated_listings.pages,
-        'total_items': paginated_listings.total,
-        'has_next': paginated_listings.has_next,
-        'has_prev': paginated_listings.has_prev,
-        'next_page': paginated_listings.next_num if paginated_listings.has_next else None,
-        'prev_page': paginated_listings.prev_num if paginated_listings.has_prev else None
-    }
-
-    return jsonify({'data': listings_with_extra_data, 'meta': meta}), 200
\ No newline at end of file
+    search, error = listings.parse_search(request.args)
+    if error:
+        return jsonify({'message': error}), 400
+
+    # Stamp before querying: a write racing the queries then only makes the ETag older
+    etag = versions.listings_etag()
+    not_modified = versions.not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Cached pages are only served under the stamp they were built with, so
+    # any write, on any worker, turns them into misses. Users kept on the
+    # primary after their own write skip the cache entirely.
+    cache_key = cache.ResponseCache.make_key('listings', request.args)
+    cached = None if replica.sticky() else cache.listings_cache.lookup(cache_key, etag)
+    if cached is not None:
+        response = Response(cached['body'], status=200, mimetype='application/json', headers={'X-Cache': 'HIT'})
+        response.set_etag(etag, weak=True)
+        return response
+
+    statement = listings.search_statement(search)
+    per_page = search['per_page']
+    if search['cursor'] is not None:
+        try:
+            statement = seek_statement(statement, Listing.id, search['cursor'], per_page)
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        page_listings, next_cursor = seek_result(db.session.execute(statement).all(), Listing.id, per_page)
+        meta = cursor_meta(per_page, next_cursor)
+    else:
+        total = db.session.execute(count_statement(statement)).scalar()
+        statement = offset_statement(statement.order_by(Listing.id.desc()), search['page'], per_page)
+        page_listings = db.session.execute(statement).all()
+        meta = offset_meta(search['page'], per_page, total)
+
+    listing_ids = [listing.id for listing in page_listings]
+    fields = search['fields']
+
+    # Fetch booked ranges for every listing on the page in one query
+    booked_ranges = None
+    if 'unavailableDates' in fields:
+        booked_ranges = availability.booked_ranges(listing_ids)
+
+    # Read the stored rating aggregates for every listing on the page in one query
+    average_ratings = None
+    if 'averageRating' in fields:
+        average_ratings = ratings.average_ratings(listing_ids)
+
+    listings_with_extra_data = listings.serialize_listings(page_listings, booked_ranges, average_ratings, fields)
+
+    metrics.record_rows(len(listings_with_extra_data))
+    response = jsonify({'data': listings_with_extra_data, 'meta': meta})
+    if not replica.sticky():
+        cache.listings_cache.store(cache_key, {'body': response.get_data(as_text=True)}, etag,
+                                   from_replica=replica.reading_replica())
+    response.headers['X-Cache'] = 'MISS'
+    response.set_etag(etag, weak=True)
+    return response, 200
\ No newline at end of file
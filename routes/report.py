@@ -1,60 +1,69 @@
-from flask import jsonify, request, Blueprint
-from flask_jwt_extended import jwt_required
-from sqlalchemy import func
+import csv
+import io
 
-from Decorators.decorators import require_role
-from models import db, Listing, Review, Booking
+from flask import current_app, jsonify, request, Blueprint, Response, stream_with_context
+
+from Decorators.decorators import read_replica, require_role
+from services import metrics
+from services.fieldsets import parse_fields
+from services.reports import REPORT_FIELDS, STREAM_BATCH_SIZE, csv_columns, csv_row, report_query, report_row
 
 report_bp = Blueprint('report', __name__)
 
+REPORT_FORMATS = ('json', 'csv', 'ndjson')
+
+
+def _ndjson_lines(query, fields):
+    for listing in query.yield_per(STREAM_BATCH_SIZE):
+        yield current_app.json.dumps(report_row(listing, fields)) + '\n'
+
+
+def _csv_lines(query, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(csv_columns(fields))
+    for listing in query.yield_per(STREAM_BATCH_SIZE):
+        writer.writerow(csv_row(listing, fields))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
 @report_bp.route('/report_listings', methods=['GET'])
-@jwt_required()
 @require_role('admin')
+@read_replica
 def report_listings():
+    """
+    Query Parameters:
+        - country (str): Filter by country
+        - city (str): Filter by city
+        - format (str): json (default), csv or ndjson. csv and ndjson are streamed
+          row by row, so memory stays flat regardless of the report size.
+        - fields (str): Comma-separated columns to return (default: all). In csv,
+          rating_histogram expands to stars_1..stars_5.
+    """
     country = request.args.get('country', type=str)
     city = request.args.get('city', type=str)
+    report_format = request.args.get('format', default='json', type=str).lower()
+    if report_format not in REPORT_FORMATS:
+        return jsonify({'message': f'format must be one of: {", ".join(REPORT_FORMATS)}.'}), 400
+    fields, error = parse_fields(request.args, REPORT_FIELDS)
+    if error:
+        return jsonify({'message': error}), 400
 
-    query = (
-        db.session.query(
-            Listing.id,
-            Listing.title,
-            Listing.country,
-            Listing.city,
-            Listing.price,
-            func.avg(Review.rating).label('average_rating'),
-            func.count(Review.id).label('review_count')
+    query = report_query(country, city, fields)
+
+    if report_format == 'ndjson':
+        return Response(stream_with_context(_ndjson_lines(query, fields)), mimetype='application/x-ndjson')
+    if report_format == 'csv':
+        return Response(
+            stream_with_context(_csv_lines(query, fields)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=listing_report.csv'}
         )
-        .outerjoin(Booking, Booking.listing_id == Listing.id)  # Join Booking with Listing
-        .outerjoin(Review, Review.stay_id == Booking.id)  # Join Review with Booking
-        .group_by(
-            Listing.id,
-            Listing.title,
-            Listing.country,
-            Listing.city,
-            Listing.price
-        )  # Group by all selected columns from Listing
-        .order_by(func.avg(Review.rating).desc())  # Order by average rating in descending order
-    )
-
-    if country:
-        query = query.filter(Listing.country == country)
-    if city:
-        query = query.filter(Listing.city == city)
-
-    results = query.all()
-
-    data = [
-        {
-            'id': listing.id,
-            'title': listing.title,
-            'country': listing.country,
-            'city': listing.city,
-            'price': listing.price,
-            'average_rating': listing.average_rating if listing.average_rating is not None else "No reviews",
-            'review_count': listing.review_count
-        }
-        for listing in results
-    ]
+
+    data = [report_row(listing, fields) for listing in query.all()]
+    metrics.record_rows(len(data))
 
     return jsonify({
         'message': 'Report generated successfully',
@@ -0,0 +1,107 @@
+from flask import Blueprint, Response, current_app, jsonify, request, send_file
+from flask_jwt_extended import get_jwt_identity
+
+from Decorators.decorators import require_role
+from models import db, ReportJob
+from services import ratelimit, report_jobs
+from services.fieldsets import parse_fields
+from services.pagination import offset_meta
+from services.reports import REPORT_FIELDS
+
+report_jobs_bp = Blueprint('report_jobs', __name__)
+
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+
+RESULT_GONE = 'The result of this report job is no longer available on this server. Create a new job.'
+
+
+def _own_job(job_id):
+    job = db.session.get(ReportJob, job_id)
+    if job is None or job.user_id != int(get_jwt_identity()):
+        return None
+    return report_jobs.fail_if_stale(job)
+
+
+@report_jobs_bp.route('', methods=['POST'])
+@ratelimit.cost(10)
+@require_role('admin')
+def create_report_job():
+    """
+    Start building the listing report in the background.
+
+    Body or query parameters:
+        - country (str): Filter by country
+        - city (str): Filter by city
+        - fields (str): Comma-separated columns to include (default: all)
+
+    Returns 202 with the job; poll GET /jobs/<id> until its status is done.
+    """
+    data = request.get_json(silent=True) or {}
+    params = request.args.copy()
+    params.update({key: value for key, value in data.items() if isinstance(value, str)})
+    fields, error = parse_fields(params, REPORT_FIELDS)
+    if error:
+        return jsonify({'message': error}), 400
+
+    job = report_jobs.submit(get_jwt_identity(), params.get('country') or None, params.get('city') or None, fields)
+    if job is None:
+        response = jsonify({'message': 'Too many report jobs are running. Try again later.'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    response = jsonify({'message': 'Report job created', 'job': report_jobs.serialize_job(job)})
+    response.headers['Location'] = f'{request.base_url}/{job.id}'
+    return response, 202
+
+
+@report_jobs_bp.route('/<job_id>', methods=['GET'])
+@require_role('admin')
+def get_report_job(job_id):
+    """Status of a report job created by the current user."""
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({'message': 'Report job not found'}), 404
+    return jsonify({'job': report_jobs.serialize_job(job)}), 200
+
+
+@report_jobs_bp.route('/<job_id>/result', methods=['GET'])
+@require_role('admin')
+def get_report_job_result(job_id):
+    """
+    Rows of a finished report job.
+
+    Query Parameters:
+        - page (int): Page number (default: 1)
+        - per_page (int): Rows per page (default: 100, max: 1000)
+        - format (str): json (default, paginated) or ndjson (the whole result file)
+    """
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({'message': 'Report job not found'}), 404
+    if job.status != report_jobs.DONE:
+        return jsonify({'message': f'Report job is {job.status}.', 'job': report_jobs.serialize_job(job)}), 409
+
+    data_path, _ = report_jobs.result_paths(job.id)
+    if request.args.get('format', default='json', type=str).lower() == 'ndjson':
+        try:
+            return send_file(data_path, mimetype='application/x-ndjson', download_name=f'report-{job.id}.ndjson')
+        except FileNotFoundError:
+            return jsonify({'message': RESULT_GONE}), 410
+
+    page = request.args.get('page', default=1, type=int)
+    per_page = request.args.get('per_page', default=DEFAULT_PER_PAGE, type=int)
+    if page < 1:
+        return jsonify({'message': 'Page number must be 1 or greater.'}), 400
+    if per_page < 1 or per_page > MAX_PER_PAGE:
+        return jsonify({'message': f'per_page must be between 1 and {MAX_PER_PAGE}.'}), 400
+
+    # The stored rows are already JSON; splice them into the response as they are
+    try:
+        rows = report_jobs.read_rows(job.id, (page - 1) * per_page, per_page)
+    except FileNotFoundError:
+        return jsonify({'message': RESULT_GONE}), 410
+    meta = offset_meta(page, per_page, job.row_count)
+    body = b'{"data":[' + b','.join(rows) + b'],"meta":' + current_app.json.dumps(meta).encode() + b'}\n'
+    return Response(body, status=200, mimetype='application/json')
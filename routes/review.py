@@ -1,15 +1,16 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
 
-from Decorators.decorators import require_role
+from Decorators.decorators import idempotent, require_role
 from models import db, Booking, Review
+from services import ratings, versions
 from sqlalchemy import and_
 
 review_bp = Blueprint('review', __name__)
 
 @review_bp.route('/insert_review', methods=['POST'])
-@jwt_required()
 @require_role('guest')
+@idempotent
 def insert_review():
     current_user_id = get_jwt_identity()
 
@@ -77,6 +78,12 @@ def insert_review():
         comment=data.get('comment', '')
     )
     db.session.add(new_review)
-    db.session.commit()
+
+    # Keep the listing's rating aggregates in step, in the same transaction
+    ratings.record_review(booking.listing_id, rating)
+    versions.listings_changed()
+    versions.bookings_changed(current_user_id)  # get_bookings shows the stay as reviewed
+    # @idempotent commits the transaction, together with the stored response
+    db.session.flush()
 
     return jsonify({'message': 'Review inserted successfully'}), 201
@@ -0,0 +1,205 @@
+"""
+Availability engine for listings.
+
+Booked nights are kept as merged, inclusive date ranges in
+``listingBookedRanges`` instead of one ``listingBookedDates`` row per night.
+A listing booked for a whole year is one row, not 365. Overlap and
+"fully booked" checks are a single indexed range comparison.
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from sqlalchemy import delete, insert, select, update
+
+from models import db, Listing, ListingBookedDates, ListingBookedRange
+from services import versions
+
+ONE_DAY = timedelta(days=1)
+
+
+# Pure helpers over sorted lists of (date_from, date_to) tuples
+
+def merge_ranges(ranges):
+    """Sort ranges and merge the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def ranges_from_dates(dates):
+    """Compress individual dates into merged ranges."""
+    return merge_ranges((date, date) for date in dates)
+
+
+def overlaps(ranges, start, end):
+    """True if any night in [start, end] is inside the merged ranges."""
+    index = bisect_right(ranges, (end, date.max)) - 1
+    return index >= 0 and ranges[index][1] >= start
+
+
+def covers(ranges, start, end):
+    """True if every night in [start, end] is inside the merged ranges."""
+    index = bisect_right(ranges, (start, date.max)) - 1
+    return index >= 0 and ranges[index][1] >= end
+
+
+def serialize_ranges(ranges):
+    return [
+        {'from': start.strftime('%Y-%m-%d'), 'to': end.strftime('%Y-%m-%d')}
+        for start, end in ranges
+    ]
+
+
+# Database access
+
+def booked_ranges_statement(listing_ids):
+    return (
+        select(ListingBookedRange.listing_id, ListingBookedRange.date_from, ListingBookedRange.date_to)
+        .where(ListingBookedRange.listing_id.in_(listing_ids))
+        .order_by(ListingBookedRange.listing_id, ListingBookedRange.date_from)
+    )
+
+
+def group_ranges(listing_ids, rows):
+    """Fold (listing_id, date_from, date_to) rows into {listing_id: [(date_from, date_to), ...]}."""
+    ranges_by_listing = {listing_id: [] for listing_id in listing_ids}
+    for listing_id, date_from, date_to in rows:
+        ranges_by_listing[listing_id].append((date_from, date_to))
+    return ranges_by_listing
+
+
+def booked_ranges(listing_ids):
+    """Return {listing_id: [(date_from, date_to), ...]} for many listings in one query."""
+    if not listing_ids:
+        return {}
+    return group_ranges(listing_ids, db.session.execute(booked_ranges_statement(listing_ids)))
+
+
+def conflicting_ranges(listing_id, start, end):
+    """Booked ranges of a listing that overlap [start, end], clipped to it."""
+    rows = db.session.execute(
+        select(ListingBookedRange.date_from, ListingBookedRange.date_to)
+        .where(
+            ListingBookedRange.listing_id == listing_id,
+            ListingBookedRange.date_from <= end,
+            ListingBookedRange.date_to >= start
+        )
+        .order_by(ListingBookedRange.date_from)
+    )
+    return [(max(date_from, start), min(date_to, end)) for date_from, date_to in rows]
+
+
+def booked_between(start, end):
+    """EXISTS clause, correlated to Listing, for a booked night inside [start, end]."""
+    return select(ListingBookedRange.id).where(
+        ListingBookedRange.listing_id == Listing.id,
+        ListingBookedRange.date_from <= end,
+        ListingBookedRange.date_to >= start
+    ).exists()
+
+
+def fully_booked():
+    """EXISTS clause, correlated to Listing, for a listing with no free night left."""
+    return select(ListingBookedRange.id).where(
+        ListingBookedRange.listing_id == Listing.id,
+        ListingBookedRange.date_from <= Listing.availableFrom,
+        ListingBookedRange.date_to >= Listing.availableTo
+    ).exists()
+
+
+def lock_listing(listing_id):
+    """
+    Take a write lock on the listing row for the rest of the transaction, so
+    concurrent bookings of the same listing run one after another. A no-op
+    UPDATE locks the row on SQL Server and serializes writers on SQLite,
+    where SELECT ... FOR UPDATE is not available.
+    Returns False if the listing does not exist.
+    """
+    result = db.session.execute(
+        update(Listing)
+        .where(Listing.id == listing_id)
+        .values(numberOfPeople=Listing.numberOfPeople)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def book_range(listing_id, start, end):
+    """
+    Mark [start, end] as booked, merging with touching ranges of the listing.
+    Runs inside the caller's transaction and does not commit.
+    Returns the merged (start, end) range that now contains it.
+    """
+    neighbours = db.session.execute(
+        select(ListingBookedRange.id, ListingBookedRange.date_from, ListingBookedRange.date_to)
+        .where(
+            ListingBookedRange.listing_id == listing_id,
+            ListingBookedRange.date_from <= end + ONE_DAY,
+            ListingBookedRange.date_to >= start - ONE_DAY
+        )
+    ).all()
+
+    if neighbours:
+        start = min([start] + [row.date_from for row in neighbours])
+        end = max([end] + [row.date_to for row in neighbours])
+        db.session.execute(
+            delete(ListingBookedRange).where(ListingBookedRange.id.in_([row.id for row in neighbours]))
+        )
+
+    db.session.execute(
+        insert(ListingBookedRange).values(listing_id=listing_id, date_from=start, date_to=end)
+    )
+    return start, end
+
+
+def migrate_booked_dates(batch_size=500):
+    """
+    Fold the legacy one-row-per-night listingBookedDates table into merged
+    ranges, one batch of listings per transaction. Existing ranges are kept
+    and merged, so this is safe to re-run.
+    Returns (listings migrated, ranges written).
+    """
+    listings_migrated = 0
+    ranges_written = 0
+    last_listing_id = 0
+
+    while True:
+        listing_ids = db.session.execute(
+            select(ListingBookedDates.listing_id)
+            .where(ListingBookedDates.listing_id > last_listing_id)
+            .group_by(ListingBookedDates.listing_id)
+            .order_by(ListingBookedDates.listing_id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not listing_ids:
+            break
+
+        dates_by_listing = {listing_id: [] for listing_id in listing_ids}
+        rows = db.session.execute(
+            select(ListingBookedDates.listing_id, ListingBookedDates.booked_date)
+            .where(ListingBookedDates.listing_id.in_(listing_ids))
+        )
+        for listing_id, booked_date in rows:
+            dates_by_listing[listing_id].append(booked_date)
+
+        existing = booked_ranges(listing_ids)
+        new_rows = []
+        for listing_id, dates in dates_by_listing.items():
+            for date_from, date_to in merge_ranges(existing[listing_id] + ranges_from_dates(dates)):
+                new_rows.append({'listing_id': listing_id, 'date_from': date_from, 'date_to': date_to})
+
+        db.session.execute(delete(ListingBookedRange).where(ListingBookedRange.listing_id.in_(listing_ids)))
+        db.session.execute(insert(ListingBookedRange), new_rows)
+        versions.listings_changed()
+        db.session.commit()
+
+        listings_migrated += len(listing_ids)
+        ranges_written += len(new_rows)
+        last_listing_id = listing_ids[-1]
+
+    return listings_migrated, ranges_written
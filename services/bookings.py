@@ -0,0 +1,130 @@
+"""
+Booking listing (GET /get_bookings), shared by the WSGI route and the
+async app.
+
+Each booking comes back with a summary of its listing and whether it has
+been reviewed, from one joined query, so clients do not look the listings
+up one by one.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import case, exists, select
+
+from models import Booking, Listing, Review
+from services.fieldsets import parse_fields
+
+DEFAULT_PAGE = 1
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+STATUSES = ('upcoming', 'past')
+# Response attribute -> column, selected as plain rows instead of Booking instances
+BOOKING_FIELDS = {
+    'stay_id': Booking.id,
+    'listing_id': Booking.listing_id,
+    'date_from': Booking.date_from,
+    'date_to': Booking.date_to,
+    'names_of_people': Booking.names_of_people,
+    'amountOfPeople': Booking.amountOfPeople,
+}
+# Listing columns returned under 'listing'; the join only runs when it is requested
+LISTING_SUMMARY = (Listing.title, Listing.country, Listing.city, Listing.price)
+FIELDS = tuple(BOOKING_FIELDS) + ('listing', 'reviewed')
+
+
+def parse_page_size(args):
+    """Returns (per_page, error) for the paginated modes."""
+    per_page = args.get('per_page', default=DEFAULT_PER_PAGE, type=int)
+    if per_page < 1 or per_page > MAX_PER_PAGE:
+        return None, f'per_page must be between 1 and {MAX_PER_PAGE}.'
+    return per_page, None
+
+
+def parse_query(args):
+    """
+    Validate the /get_bookings query parameters (a werkzeug MultiDict).
+    Returns (query, error); query is None on error. query['today'] is set
+    when the result depends on the current date.
+    """
+    fields, error = parse_fields(args, FIELDS)
+    if error:
+        return None, error
+
+    status = args.get('status', type=str) or None
+    if status is not None and status not in STATUSES:
+        return None, f'status must be one of: {", ".join(STATUSES)}.'
+
+    date_from = args.get('dateFrom', type=str) or None
+    date_to = args.get('dateTo', type=str) or None
+    try:
+        if date_from:
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+        if date_to:
+            date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
+    except ValueError:
+        return None, 'Invalid date format. Use YYYY-MM-DD.'
+    if date_from and date_to and date_from > date_to:
+        return None, 'dateFrom must be on or before dateTo.'
+
+    cursor = args.get('cursor', type=str)
+    page = args.get('page', type=int)
+    per_page = None
+    if cursor is not None or page is not None:
+        if page is not None and page < 1:
+            return None, 'Page number must be 1 or greater.'
+        per_page, error = parse_page_size(args)
+        if error:
+            return None, error
+
+    return {
+        'fields': fields,
+        'status': status,
+        'today': date.today() if status else None,
+        'date_from': date_from,
+        'date_to': date_to,
+        'cursor': cursor,
+        'page': page,
+        'per_page': per_page,
+    }, None
+
+
+def bookings_statement(user_id, query):
+    """
+    The user's bookings matching a parsed query, without ordering or
+    paging. Only the requested columns are selected, plus the id. Served by
+    ix_bookings_guest_date_from.
+    """
+    fields = query['fields']
+    columns = [Booking.id] + [BOOKING_FIELDS[name] for name in fields if name in BOOKING_FIELDS and name != 'stay_id']
+    if 'listing' in fields:
+        columns += [column.label(f'listing_{column.key}') for column in LISTING_SUMMARY]
+    if 'reviewed' in fields:
+        # CASE so SQL Server, which has no boolean select expressions, accepts it
+        columns.append(case((exists().where(Review.stay_id == Booking.id), True), else_=False).label('reviewed'))
+
+    statement = select(*columns).where(Booking.issuer_guest_id == int(user_id))
+    if 'listing' in fields:
+        statement = statement.join(Listing, Listing.id == Booking.listing_id)
+
+    # Stays are inclusive of date_to, so one still in progress counts as upcoming
+    if query['status'] == 'upcoming':
+        statement = statement.where(Booking.date_to >= query['today'])
+    elif query['status'] == 'past':
+        statement = statement.where(Booking.date_to < query['today'])
+    # Stays overlapping dateFrom..dateTo
+    if query['date_from']:
+        statement = statement.where(Booking.date_to >= query['date_from'])
+    if query['date_to']:
+        statement = statement.where(Booking.date_from <= query['date_to'])
+    return statement
+
+
+def serialize_booking(row, fields=FIELDS):
+    booking = {}
+    for name in fields:
+        if name == 'listing':
+            booking[name] = {column.key: getattr(row, f'listing_{column.key}') for column in LISTING_SUMMARY}
+        elif name == 'reviewed':
+            booking[name] = bool(row.reviewed)
+        else:
+            booking[name] = getattr(row, BOOKING_FIELDS[name].key)
+    return booking
@@ -0,0 +1,195 @@
+"""
+Caches shared by the services: a small in-process TTL/LRU cache, and a
+response cache keyed by database version stamps on pluggable backends.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from services import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe mapping with a per-entry time to live and LRU eviction once
+    ``maxsize`` entries are stored. Entries are local to the worker process.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InProcessBackend:
+    """Cache backend local to the worker process: entries in an LRU/TTL cache."""
+
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl=ttl)
+
+
+class SharedStoreBackend:
+    """
+    Cache backend on a store shared by all workers. ``client`` needs the
+    Redis-style methods get(key) and set(key, value, ex=seconds). Size bounds
+    are left to the store's own eviction policy.
+    """
+
+    def __init__(self, client, prefix='stsc:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+
+class LocalStore:
+    """
+    In-memory stand-in for a shared store client (get/set), for tests and
+    single-process development.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (None, None))
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, None if ex is None else self._clock() + ex)
+
+
+class ResponseCache:
+    """
+    Read-through cache of rendered responses, keyed by a version stamp.
+
+    Every entry stores the stamp read from the database before it was built
+    (see services.versions). A lookup only hits if the caller's current
+    stamp is the same, so any write that moves the stamp, whichever worker
+    made it, turns the entry into a miss. Writers therefore need no
+    invalidation calls. Entries are replaced by the next miss or expire
+    after ``ttl`` seconds.
+
+    With a read replica, services.replica calls note_write() after every
+    write, which sets a marker for recent_write_window seconds (the sticky
+    window). Entries built from replica reads are not stored while it is
+    set, since the replica may not have the write yet.
+    """
+    RECENT_WRITE = 'recent-write'
+
+    def __init__(self, name, backend=None, ttl=30.0, recent_write_window=0):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.recent_write_window = recent_write_window
+
+    def configure(self, backend, ttl=None, recent_write_window=None):
+        self.backend = backend
+        if ttl is not None:
+            self.ttl = ttl
+        if recent_write_window is not None:
+            self.recent_write_window = recent_write_window
+
+    @staticmethod
+    def make_key(prefix, args):
+        """Normalize query parameters: sorted, blanks dropped."""
+        items = sorted((key, value) for key, value in args.items(multi=True) if value != '')
+        return prefix + '?' + urlencode(items)
+
+    def lookup(self, key, stamp):
+        """The value stored for key under ``stamp``, or None."""
+        if self.backend is None:
+            return None
+        entry = self.backend.get(self.name + ':' + key)
+        if entry is not None and entry['stamp'] == stamp:
+            metrics.CACHE_REQUESTS.inc(cache=self.name, result='hit')
+            return entry['value']
+        metrics.CACHE_REQUESTS.inc(cache=self.name, result='miss')
+        return None
+
+    def store(self, key, value, stamp, from_replica=False):
+        """
+        stamp: the one read before value was built.
+        from_replica: value was built from replica reads.
+        """
+        if self.backend is None:
+            return
+        if from_replica and self.recent_write_window and self.backend.get(self.RECENT_WRITE) is not None:
+            return
+        self.backend.set(self.name + ':' + key, {'stamp': stamp, 'value': value}, self.ttl)
+
+    def note_write(self):
+        if self.backend is not None and self.recent_write_window:
+            self.backend.set(self.RECENT_WRITE, True, self.recent_write_window)
+
+
+listings_cache = ResponseCache('listings')
+
+
+def init_app(app):
+    """
+    Configure the response caches from app.config. RESPONSE_CACHE_BACKEND is
+    'memory' (default) or 'none'; a shared store is plugged in with
+    listings_cache.configure(SharedStoreBackend(client)).
+    """
+    ttl = app.config.get('RESPONSE_CACHE_TTL', 30)
+    if app.config.get('RESPONSE_CACHE_BACKEND', 'memory') == 'none':
+        listings_cache.configure(None)
+    else:
+        maxsize = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        listings_cache.configure(InProcessBackend(maxsize=maxsize, ttl=ttl), ttl=ttl)
@@ -0,0 +1,59 @@
+"""
+Negotiated response compression: brotli (when the Brotli package is
+installed) or gzip, picked from the request's Accept-Encoding, for bodies
+of at least COMPRESSION_MIN_SIZE bytes. Smaller bodies are not worth the
+CPU. Streamed responses (CSV/NDJSON reports) and files are passed through
+untouched so they keep flowing row by row.
+"""
+import gzip
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+# Fast settings: these bodies are compressed on every request, not once
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """The preferred encoding we support from an Accept-Encoding value, or None."""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def init_app(app):
+    """Compress responses unless RESPONSE_COMPRESSION is off."""
+    if not app.config.get('RESPONSE_COMPRESSION', True):
+        return
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code not in (200, 201)
+                or 'Content-Encoding' in response.headers):
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
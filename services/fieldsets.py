@@ -0,0 +1,20 @@
+"""
+Sparse fieldsets: ``?fields=title,city,price`` limits a list response to
+the named attributes. Routes parse the selection before querying, so the
+columns and lookups behind attributes nobody asked for are skipped.
+"""
+
+
+def parse_fields(args, allowed):
+    """
+    Returns (fields, error). fields is a tuple in the order of ``allowed``;
+    all of them when the parameter is missing or blank.
+    """
+    raw = args.get('fields', default='', type=str)
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    if not requested:
+        return tuple(allowed), None
+    unknown = sorted(requested.difference(allowed))
+    if unknown:
+        return None, f'Unknown fields: {", ".join(unknown)}. Allowed: {", ".join(allowed)}.'
+    return tuple(name for name in allowed if name in requested), None
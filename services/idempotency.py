@@ -0,0 +1,135 @@
+"""
+Idempotency-Key support for the POST routes that create bookings and reviews.
+
+A retry carrying the same key (per user and route) gets the first response
+back without the route running again. Before the route runs, the key is
+claimed with a pending row in idempotencyKeys. A retry that races the first
+request then gets 409 instead of running the transaction a second time.
+
+The route's writes and its stored response are committed in one
+transaction (see @idempotent): either both are in the table or neither is.
+A claim still pending after PENDING_TIMEOUT therefore belongs to a request
+whose work was never committed, and a retry can safely take it over.
+
+Results are kept for IDEMPOTENCY_TTL seconds, with a per-process cache in
+front so most replays cost no query. Server errors (5xx) are not stored:
+the claim is released so the client can retry.
+"""
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from flask import Response, current_app, jsonify
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+from services.cache import TTLCache
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 24 * 60 * 60
+# A claim older than this is taken over: the worker running it has died
+PENDING_TIMEOUT = 60
+
+Result = namedtuple('Result', 'request_hash status_code body')
+
+_results = TTLCache(maxsize=10000, ttl=DEFAULT_TTL)
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def record_id(user_id, endpoint, key):
+    return hashlib.sha256(f'{user_id}\x00{endpoint}\x00{key}'.encode()).hexdigest()
+
+
+def fingerprint(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def lookup(record_id):
+    """Completed result from the per-process cache, or None."""
+    return _results.get(record_id)
+
+
+def claim(record_id, request_hash):
+    """
+    Claim the key for a first request. Returns None once claimed, else the
+    live Result (status_code None if another request holds the claim).
+    Commits.
+    """
+    now = _now()
+    record = db.session.get(IdempotencyKey, record_id)
+    if record is not None and record.expires_at > now:
+        result = Result(record.request_hash, record.status_code, record.body)
+        db.session.rollback()
+        return result
+
+    if record is not None:
+        db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id == record_id, IdempotencyKey.expires_at <= now)
+        )
+    db.session.add(IdempotencyKey(
+        id=record_id, request_hash=request_hash, expires_at=now + timedelta(seconds=PENDING_TIMEOUT)
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Claimed by a concurrent request with the same key
+        db.session.rollback()
+        return Result(request_hash, None, None)
+    return None
+
+
+def complete(record_id, request_hash, response):
+    """
+    Store the route's response for replays and commit it together with the
+    route's own uncommitted writes.
+    """
+    ttl = current_app.config.get('IDEMPOTENCY_TTL', DEFAULT_TTL)
+    body = response.get_data(as_text=True)
+    db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == record_id)
+        .values(status_code=response.status_code, body=body, expires_at=_now() + timedelta(seconds=ttl))
+    )
+    db.session.commit()
+    _results.set(record_id, Result(request_hash, response.status_code, body), ttl=ttl)
+
+
+def release(record_id):
+    """Drop a claim so the request can be retried. Commits."""
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+    db.session.commit()
+
+
+def replay(result, request_hash):
+    """Response for a request whose key already has a claim or a result."""
+    if result.status_code is None:
+        response = jsonify({'message': f'A request with this {HEADER} is still being processed.'})
+        response.status_code = 409
+        response.headers['Retry-After'] = '1'
+        return response
+    if result.request_hash != request_hash:
+        response = jsonify({'message': f'{HEADER} was already used for a different request.'})
+        response.status_code = 422
+        return response
+    return Response(result.body, status=result.status_code, mimetype='application/json',
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired rows in batches. Returns the number deleted."""
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= _now()).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
@@ -0,0 +1,309 @@
+"""
+Listing validation, bulk import, and the /listings search.
+"""
+import csv
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Listing
+from services import availability, locations
+from services.fieldsets import parse_fields
+
+REQUIRED_FIELDS = ['numberOfPeople', 'country', 'city', 'price', 'availableFrom', 'availableTo']
+BULK_CHUNK_SIZE = 500
+
+
+def parse_listing(data, user_id):
+    """
+    Validate a listing payload and convert it to column values, including
+    the content hash. Returns (values, errors); values is None on errors.
+    """
+    if not isinstance(data, dict):
+        return None, ['Row must be an object.']
+
+    missing_fields = [field for field in REQUIRED_FIELDS if data.get(field) in (None, '')]
+    if missing_fields:
+        return None, [f'Missing required fields: {",".join(missing_fields)}']
+
+    errors = []
+    values = {'user_id': int(user_id), 'title': data.get('title') or '.'}
+
+    try:
+        values['numberOfPeople'] = int(data['numberOfPeople'])
+        if not 1 <= values['numberOfPeople'] <= 32:
+            errors.append('numberOfPeople must be between 1 and 32.')
+    except (TypeError, ValueError):
+        errors.append('numberOfPeople must be an integer.')
+
+    try:
+        values['price'] = float(data['price'])
+        if not math.isfinite(values['price']):
+            errors.append('price must be a finite number.')
+        elif values['price'] < 0:
+            errors.append('price must not be negative.')
+    except (TypeError, ValueError):
+        errors.append('price must be a number.')
+
+    for field, max_length in (('title', 80), ('country', 128), ('city', 128)):
+        value = values.get(field, data.get(field))
+        if not isinstance(value, str) or len(value) > max_length:
+            errors.append(f'{field} must be text of at most {max_length} characters.')
+        else:
+            values[field] = value
+
+    try:
+        values['availableFrom'] = datetime.strptime(str(data['availableFrom']), '%Y-%m-%d').date()
+        values['availableTo'] = datetime.strptime(str(data['availableTo']), '%Y-%m-%d').date()
+        if values['availableFrom'] > values['availableTo']:
+            errors.append('availableFrom must be on or before availableTo.')
+    except ValueError:
+        errors.append('Invalid date format. Use YYYY-MM-DD.')
+
+    if errors:
+        return None, errors
+
+    values['content_hash'] = Listing.compute_content_hash(**{
+        field: values[field] for field in
+        ('user_id', 'title', 'numberOfPeople', 'country', 'city', 'price', 'availableFrom', 'availableTo')
+    })
+    return values, []
+
+
+def listing_exists(content_hash):
+    return db.session.execute(
+        select(Listing.id).where(Listing.content_hash == content_hash).limit(1)
+    ).first() is not None
+
+
+def read_ndjson(lines):
+    """Yield one payload per non-blank line; unparsable lines yield None."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_csv(lines):
+    yield from csv.DictReader(lines)
+
+
+def import_listings(rows, user_id, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Validate and insert listing payloads chunk by chunk, one transaction per
+    chunk. Duplicates are found by content hash, against the database and
+    within the upload. Rows the database rejects are reported as failed.
+    Returns one result dict per row.
+    """
+    results = []
+    chunk = []
+    row_number = 0
+    for data in rows:
+        row_number += 1
+        chunk.append((row_number, data))
+        if len(chunk) >= chunk_size:
+            results.extend(_import_chunk(chunk, user_id))
+            chunk = []
+    if chunk:
+        results.extend(_import_chunk(chunk, user_id))
+    return results
+
+
+def _import_chunk(chunk, user_id):
+    results = []
+    parsed = []
+    for row_number, data in chunk:
+        if data is None:
+            results.append({'row': row_number, 'status': 'invalid', 'errors': ['Row is not valid JSON.']})
+            continue
+        values, errors = parse_listing(data, user_id)
+        if errors:
+            results.append({'row': row_number, 'status': 'invalid', 'errors': errors})
+        else:
+            parsed.append((row_number, values))
+
+    hashes = {values['content_hash'] for _, values in parsed}
+    seen = set()
+    if hashes:
+        seen.update(db.session.execute(
+            select(Listing.content_hash).where(Listing.content_hash.in_(hashes))
+        ).scalars())
+
+    new_rows = []
+    for row_number, values in parsed:
+        if values['content_hash'] in seen:
+            results.append({'row': row_number, 'status': 'duplicate'})
+            continue
+        seen.add(values['content_hash'])
+        new_rows.append((row_number, values))
+
+    try:
+        if new_rows:
+            db.session.execute(insert(Listing), [values for _, values in new_rows])
+        db.session.commit()
+        created = new_rows
+    except IntegrityError:
+        db.session.rollback()
+        created = _insert_one_by_one(new_rows, results)
+
+    for row_number, values in created:
+        results.append({'row': row_number, 'status': 'created'})
+        locations.listing_added(values['country'], values['city'])
+
+    results.sort(key=lambda result: result['row'])
+    return results
+
+
+def _insert_one_by_one(rows, results):
+    """
+    Insert rows of a chunk the database rejected as a whole one at a time,
+    so only the offending rows fail. Returns the inserted rows.
+    """
+    created = []
+    for row_number, values in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(Listing), [values])
+        except IntegrityError as e:
+            results.append({'row': row_number, 'status': 'failed', 'errors': [str(e.orig)[:200]]})
+        else:
+            created.append((row_number, values))
+    db.session.commit()
+    return created
+
+
+def backfill_content_hashes(batch_size=1000):
+    """Fill content_hash for listings created before the column existed. Returns the count."""
+    updated = 0
+    while True:
+        listings = db.session.execute(
+            select(Listing).where(Listing.content_hash.is_(None)).order_by(Listing.id).limit(batch_size)
+        ).scalars().all()
+        if not listings:
+            return updated
+        db.session.execute(update(Listing), [
+            {
+                'id': listing.id,
+                'content_hash': Listing.compute_content_hash(
+                    listing.user_id or 0, listing.title, listing.numberOfPeople, listing.country,
+                    listing.city, listing.price, listing.availableFrom, listing.availableTo
+                )
+            }
+            for listing in listings
+        ])
+        db.session.commit()
+        updated += len(listings)
+
+
+# Search (GET /listings), shared by the WSGI route and the async app
+
+DEFAULT_PAGE = 1
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+# Selected as plain rows, in the order of Listing.to_dict()
+LISTING_COLUMNS = (
+    Listing.id, Listing.user_id, Listing.title, Listing.numberOfPeople, Listing.country, Listing.city,
+    Listing.price, Listing.availableFrom, Listing.availableTo
+)
+# Attributes a client can pick with ?fields=; the last two cost one query each
+LISTING_FIELDS = tuple(column.key for column in LISTING_COLUMNS) + ('unavailableDates', 'averageRating')
+
+
+def parse_search(args):
+    """
+    Validate the /listings query parameters (a werkzeug MultiDict).
+    Returns (search, error); search is None on error.
+    """
+    page = args.get('page', default=DEFAULT_PAGE, type=int)
+    per_page = args.get('per_page', default=DEFAULT_PER_PAGE, type=int)
+    if page < 1:
+        return None, 'Page number must be 1 or greater.'
+    if per_page < 1 or per_page > MAX_PER_PAGE:
+        return None, f'per_page must be between 1 and {MAX_PER_PAGE}.'
+
+    date_from = args.get('dateFrom', type=str)
+    date_to = args.get('dateTo', type=str)
+    if bool(date_from) != bool(date_to):
+        return None, 'dateFrom and dateTo must be provided together.'
+    if date_from:
+        try:
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
+        except ValueError:
+            return None, 'Invalid date format. Use YYYY-MM-DD.'
+        if date_from > date_to:
+            return None, 'dateFrom must be on or before dateTo.'
+
+    fields, error = parse_fields(args, LISTING_FIELDS)
+    if error:
+        return None, error
+
+    return {
+        'page': page,
+        'per_page': per_page,
+        'cursor': args.get('cursor', type=str),
+        'country': args.get('country', type=str),
+        'city': args.get('city', type=str),
+        'number_of_people': args.get('numberOfPeople', type=int),
+        'date_from': date_from or None,
+        'date_to': date_to or None,
+        'fields': fields,
+    }, None
+
+
+def page_cost(args):
+    """Rate-limit tokens for a /listings request: one per DEFAULT_PER_PAGE listings asked for."""
+    per_page = args.get('per_page', default=DEFAULT_PER_PAGE, type=int)
+    return max(1, math.ceil(per_page / DEFAULT_PER_PAGE))
+
+
+def search_statement(search):
+    """
+    SELECT of the listings matching a parsed search, without ordering or
+    paging. Only the requested columns are selected, plus the id.
+    """
+    fields = search['fields']
+    statement = select(*(column for column in LISTING_COLUMNS if column is Listing.id or column.key in fields))
+    if search['country']:
+        statement = statement.where(Listing.country == search['country'])
+    if search['city']:
+        statement = statement.where(Listing.city == search['city'])
+    if search['number_of_people']:
+        statement = statement.where(Listing.numberOfPeople >= search['number_of_people'])
+
+    if search['date_from']:
+        # The listing must cover the whole range and have no booked night inside it
+        statement = statement.where(
+            Listing.availableFrom <= search['date_from'],
+            Listing.availableTo >= search['date_to'],
+            ~availability.booked_between(search['date_from'], search['date_to'])
+        )
+    else:
+        # Skip listings whose whole availability range is booked
+        statement = statement.where(~availability.fully_booked())
+    return statement
+
+
+def serialize_listings(rows, booked_ranges, average_ratings, fields=LISTING_FIELDS):
+    """
+    Listing rows with their unavailable date ranges and average rating (0.0
+    if no reviews). Pass None for booked_ranges or average_ratings when that
+    field was not requested.
+    """
+    data = []
+    for row in rows:
+        listing = row._asdict()
+        if 'id' not in fields:
+            del listing['id']
+        if booked_ranges is not None:
+            listing['unavailableDates'] = availability.serialize_ranges(booked_ranges[row.id])
+        if average_ratings is not None:
+            listing['averageRating'] = average_ratings.get(row.id) or 0.0
+        data.append(listing)
+    return data
@@ -0,0 +1,167 @@
+"""
+In-process location index for autocomplete.
+
+Country and city names are normalized (case-folded, accents stripped) and
+kept in one sorted array, so a prefix lookup is a bisect plus a short scan
+and never touches the database. Listing counts are kept per location.
+
+Short prefixes match many names, so their best matches are cached until
+the index next changes.
+
+The index is built from one GROUP BY query on first use, then rebuilt in a
+background thread every LOCATION_INDEX_TTL seconds so listings added by
+other workers show up. Listings inserted by this worker are added right away.
+"""
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Listing
+
+DEFAULT_TTL = 300
+MAX_RESULTS = 50
+# Prefixes matching more names than this get their best MAX_RESULTS cached
+TOP_CACHE_THRESHOLD = 200
+
+
+def normalize(name):
+    decomposed = unicodedata.normalize('NFKD', (name or '').strip().casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class LocationIndex:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # country key -> [name, count]; (country key, city key) -> [country name, city name, count]
+        self._locations = {}
+        self._sorted = ([], [])  # (normalized names, matching location keys), swapped as a whole
+        self._top = {}  # prefix -> best keys, for prefixes that match many names
+        self.built_at = None
+        self.refreshing = False
+
+    def load(self, rows):
+        """Replace the contents with (country, city, listing count) rows."""
+        countries = {}
+        cities = {}
+        for country, city, count in rows:
+            country_key = normalize(country)
+            city_key = (country_key, normalize(city))
+            countries.setdefault(country_key, [country, 0])[1] += count
+            # The spelling with the most listings wins
+            entry = cities.setdefault(city_key, [country, city, 0, 0])
+            entry[2] += count
+            if count > entry[3]:
+                entry[0], entry[1], entry[3] = country, city, count
+
+        # A country and a city can share a name; str(key) orders them the same way _insert() does
+        entries = sorted(
+            [(country_key, country_key) for country_key in countries]
+            + [(city_key[1], city_key) for city_key in cities],
+            key=lambda entry: (entry[0], str(entry[1]))
+        )
+        locations = dict(countries)
+        locations.update((key, value[:3]) for key, value in cities.items())
+        with self._lock:
+            self._locations = locations
+            self._sorted = ([name for name, _ in entries], [key for _, key in entries])
+            self._top = {}
+            self.built_at = self._clock()
+
+    def add(self, country, city, count=1):
+        """Count new listings. A location seen for the first time is inserted in order."""
+        country_key = normalize(country)
+        city_key = (country_key, normalize(city))
+        with self._lock:
+            names, keys = self._sorted
+            new_names, new_keys = list(names), list(keys)
+            for key, name, value in ((country_key, country_key, [country, count]),
+                                     (city_key, city_key[1], [country, city, count])):
+                if key in self._locations:
+                    self._locations[key][-1] += count
+                else:
+                    self._locations[key] = value
+                    self._insert(new_names, new_keys, name, key)
+            if len(new_names) != len(names):
+                self._sorted = (new_names, new_keys)
+            self._top = {}
+
+    @staticmethod
+    def _insert(names, keys, name, key):
+        position = bisect_left(names, name)
+        while position < len(names) and names[position] == name and str(keys[position]) < str(key):
+            position += 1
+        names.insert(position, name)
+        keys.insert(position, key)
+
+    def _rank(self, key):
+        return -self._locations[key][-1], str(key)
+
+    def search(self, prefix, limit=10):
+        """Countries and cities whose name starts with prefix, most listings first."""
+        prefix = normalize(prefix)
+        names, keys = self._sorted
+        start = bisect_left(names, prefix)
+        end = bisect_left(names, prefix + '\U0010ffff', start)
+
+        if end - start > TOP_CACHE_THRESHOLD:
+            best = self._top.get(prefix)
+            if best is None:
+                best = self._top[prefix] = heapq.nsmallest(MAX_RESULTS, keys[start:end], key=self._rank)
+            best = best[:limit]
+        else:
+            best = heapq.nsmallest(limit, keys[start:end], key=self._rank)
+
+        results = []
+        for key in best:
+            if isinstance(key, tuple):
+                country, city, count = self._locations[key]
+                results.append({'type': 'city', 'country': country, 'city': city, 'count': count})
+            else:
+                country, count = self._locations[key]
+                results.append({'type': 'country', 'country': country, 'count': count})
+        return results
+
+    def is_stale(self, ttl):
+        return self.built_at is None or self._clock() - self.built_at > ttl
+
+    def __len__(self):
+        return len(self._sorted[0])
+
+
+index = LocationIndex()
+
+
+def _location_counts():
+    return db.session.execute(
+        select(Listing.country, Listing.city, func.count()).group_by(Listing.country, Listing.city)
+    ).all()
+
+
+def _refresh(app):
+    try:
+        with app.app_context():
+            index.load(_location_counts())
+    finally:
+        index.refreshing = False
+
+
+def get_index():
+    """The index, built on first use and refreshed in the background once stale."""
+    if index.built_at is None:
+        index.load(_location_counts())
+    elif not index.refreshing and index.is_stale(current_app.config.get('LOCATION_INDEX_TTL', DEFAULT_TTL)):
+        index.refreshing = True
+        threading.Thread(target=_refresh, args=(current_app._get_current_object(),), daemon=True).start()
+    return index
+
+
+def listing_added(country, city):
+    """Count a listing this worker just committed (ignored until the index is built)."""
+    if index.built_at is not None:
+        index.add(country, city)
@@ -0,0 +1,76 @@
+"""
+Structured, non-blocking logging.
+
+Records are formatted as one JSON object per line. Request threads only
+put records on a queue; a QueueListener thread does the formatting and the
+stdout I/O. Pass structured fields with ``extra``:
+
+    logger.info('Booking inserted', extra={'listing_id': 3, 'nights': 2})
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def init_logging(level='INFO'):
+    """Route the root logger through a queue to a JSON stdout handler. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+    # Threads do not survive fork(): workers forked from a preloaded app need their own listener
+    os.register_at_fork(after_in_child=_restart_listener)
+
+
+def _stop_listener():
+    _listener.stop()
+
+
+def _restart_listener():
+    """
+    Give the child a fresh queue: records left in the inherited one belong to
+    the parent, and its lock may have been held by the parent's listener.
+    """
+    global _listener
+    log_queue = queue.Queue(-1)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
@@ -0,0 +1,151 @@
+"""
+Per-request performance metrics in Prometheus text format.
+
+init_app() times every request and counts the SQL statements it runs (via
+SQLAlchemy engine events) and the rows list endpoints return. The numbers
+are exposed as histograms on GET /metrics. Values are kept per worker
+process, so each scrape reports the worker that answered it.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(zip(self.labelnames, key))} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                labels = list(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('+inf'),), bucket_counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('+inf') else repr(float(bound))
+                    lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+def render_all():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ('method', 'route', 'status'))
+REQUEST_SQL_QUERIES = Histogram(
+    'http_request_sql_queries', 'SQL statements executed per request.', ('route',), COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL per request.', ('route',))
+RESPONSE_ROWS = Histogram(
+    'http_response_rows', 'Rows returned by list endpoints.', ('route',), COUNT_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'response_cache_requests_total', 'Response cache lookups by cache and result.', ('cache', 'result'))
+
+
+def record_rows(count):
+    """Called by list endpoints with the number of rows they return."""
+    if has_request_context():
+        g.metrics_rows = count
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.metrics_sql_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics_sql_started' in g:
+        g.metrics_sql_queries = g.get('metrics_sql_queries', 0) + 1
+        g.metrics_sql_seconds = g.get('metrics_sql_seconds', 0.0) + time.perf_counter() - g.metrics_sql_started
+
+
+def init_app(app):
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        if 'metrics_started' not in g:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        if route == '/metrics':
+            return response
+        REQUEST_LATENCY.observe(time.perf_counter() - g.metrics_started,
+                                method=request.method, route=route, status=str(response.status_code))
+        REQUEST_SQL_QUERIES.observe(g.get('metrics_sql_queries', 0), route=route)
+        REQUEST_SQL_SECONDS.observe(g.get('metrics_sql_seconds', 0.0), route=route)
+        if 'metrics_rows' in g:
+            RESPONSE_ROWS.observe(g.metrics_rows, route=route)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_all(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,90 @@
+"""
+Keyset (cursor) and offset pagination.
+
+Keyset: instead of OFFSET and a COUNT(*), a page seeks past the last key
+of the previous page. The position is handed to clients as an opaque
+cursor.
+
+The *_statement helpers only build SELECTs, so the sync routes and the
+async app (asgi.py) page the same way and return the same meta.
+"""
+import base64
+import json
+import math
+
+from sqlalchemy import func, select
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(**keys):
+    raw = json.dumps(keys, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor(). An empty cursor starts from the first page."""
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        keys = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor.')
+    if not isinstance(keys, dict):
+        raise InvalidCursor('Invalid cursor.')
+    return keys
+
+
+def seek_statement(statement, column, cursor, per_page):
+    """
+    Order a SELECT by ``column`` descending and seek past the
+    cursor. ``column`` must be unique (a primary key). One extra row is
+    fetched to know whether another page exists, so no count query is needed.
+    """
+    keys = decode_cursor(cursor)
+    if 'id' in keys:
+        if not isinstance(keys['id'], int):
+            raise InvalidCursor('Invalid cursor.')
+        statement = statement.filter(column < keys['id'])
+    return statement.order_by(column.desc()).limit(per_page + 1)
+
+
+def seek_result(items, column, per_page):
+    """Return (items, next_cursor) from the rows of a seek_statement()."""
+    if len(items) <= per_page:
+        return items, None
+    items = items[:per_page]
+    return items, encode_cursor(id=getattr(items[-1], column.key))
+
+
+def cursor_meta(per_page, next_cursor):
+    return {
+        'per_page': per_page,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }
+
+
+def count_statement(statement):
+    return select(func.count()).select_from(statement.order_by(None).subquery())
+
+
+def offset_statement(statement, page, per_page):
+    return statement.limit(per_page).offset((page - 1) * per_page)
+
+
+def offset_meta(page, per_page, total):
+    pages = math.ceil(total / per_page) if total else 0
+    return {
+        'page': page,
+        'per_page': per_page,
+        'total_pages': pages,
+        'total_items': total,
+        'has_next': page < pages,
+        'has_prev': page > 1,
+        'next_page': page + 1 if page < pages else None,
+        'prev_page': page - 1 if page > 1 else None
+    }
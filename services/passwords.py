@@ -0,0 +1,108 @@
+"""
+Password hashing off the request thread.
+
+Hashing and verification are CPU-bound (pbkdf2/scrypt). They run on a
+bounded process pool, and the request thread only waits for the result.
+Under gunicorn's gthread workers the worker's other threads keep serving
+requests meanwhile, so a burst of logins does not stall the GETs.
+
+PASSWORD_HASH_WORKERS is the number of hashing processes for the whole
+host. Each of the WEB_CONCURRENCY worker processes gets an equal share of
+it, at least one, so at most max(PASSWORD_HASH_WORKERS, WEB_CONCURRENCY)
+hashes run at once on the host. The algorithm and cost come from
+PASSWORD_HASH_METHOD. Hashes made with an older method are upgraded when
+the user next logs in.
+
+The pool's processes are started by a forkserver (spawn where there is
+none), never forked from the worker itself: a gthread worker has other
+threads that may hold locks at the moment of a fork. Under gunicorn the
+pool is started in post_fork, before the worker's threads exist, so the
+first login does not pay for starting it.
+
+Config:
+    PASSWORD_HASH_METHOD  werkzeug method string, e.g. 'pbkdf2:sha256:600000'
+                          or 'scrypt:32768:8:1' (default: 'pbkdf2:sha256')
+    PASSWORD_HASH_WORKERS hashing processes per host; 0 hashes inline (default: 2)
+    WEB_CONCURRENCY       gunicorn worker processes on the host (default: 1)
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256'
+DEFAULT_WORKERS = 2
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_normalized_methods = {}
+
+
+def _start_method():
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _pool(workers):
+    """The process pool of this worker process, created on first use (and again after a fork)."""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context(_start_method()))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def pool_size(host_workers, web_workers):
+    """This worker process's share of the host's hashing processes."""
+    return max(1, host_workers // max(1, web_workers))
+
+
+def _workers(config):
+    """Hashing processes for this worker process, 0 to hash inline."""
+    host_workers = config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS)
+    if not host_workers:
+        return 0
+    return pool_size(host_workers, config.get('WEB_CONCURRENCY', 1))
+
+
+def _run(fn, *args):
+    workers = _workers(current_app.config)
+    if not workers:
+        return fn(*args)
+    return _pool(workers).submit(fn, *args).result()
+
+
+def warm_up(config):
+    """Start this worker process's hashing processes and wait until they answer."""
+    workers = _workers(config)
+    if workers:
+        pool = _pool(workers)
+        for future in [pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+
+
+def _configured_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _configured_method())
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if the hash was not made with the configured method and cost."""
+    method = _configured_method()
+    if method not in _normalized_methods:
+        # werkzeug fills in default costs ('pbkdf2:sha256' -> 'pbkdf2:sha256:1000000');
+        # hash once to learn the full method string to compare against
+        _normalized_methods[method] = generate_password_hash('', method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _normalized_methods[method]
@@ -0,0 +1,268 @@
+"""
+Per-user token-bucket rate limiting, with a budget per blueprint.
+
+Every client has one bucket per limited blueprint. The client is the JWT
+identity, or the remote address for anonymous requests. Behind a proxy,
+remote_addr is the client's only when create_app applies ProxyFix
+(TRUSTED_PROXY_HOPS); otherwise every anonymous client shares the proxy's
+bucket. Views decorated with @budget draw on their own budgets instead,
+optionally with their own client key; stacked @budget decorators all
+apply. Login takes a token from a per-address budget and from a per-email
+budget, and sign-up has its own per-address budget, so neither shares the
+budget of authenticated auth traffic. A request takes
+``cost`` tokens (1 unless the view is decorated with @cost) and buckets
+refill continuously up to their capacity. Requests that find too few
+tokens are turned away with 429 and Retry-After in before_request, before
+the view runs any query. One client looping over expensive pages therefore
+cannot tie up every worker.
+
+Buckets are kept per worker process by default. With SharedStoreBackend,
+all workers share them through a store with a Redis-style
+eval(script, numkeys, *args); LocalBucketStore stands in for one.
+"""
+import math
+import threading
+import time
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from services import metrics
+from services.cache import TTLCache
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+# Requests per blueprint per client
+DEFAULT_LIMITS = {
+    'auth': '30/minute',
+    'listing': '300/minute',
+    'booking': '60/minute',
+    'review': '30/minute',
+    'report': '10/minute',
+    # Status polls and result pages; creating a job costs 10
+    'report_jobs': '120/minute',
+    # Anonymous auth views (@budget): login attempts per address and per email, sign-ups per address
+    'login': '30/minute',
+    'login_email': '10/minute',
+    'signup': '20/hour',
+}
+
+RATE_LIMITED = metrics.Counter(
+    'rate_limited_requests_total', 'Requests rejected with 429 by blueprint.', ('blueprint',))
+
+
+def parse_limit(value):
+    """'120/minute' -> (capacity, tokens refilled per second)."""
+    count, _, period = value.strip().partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f'Invalid rate limit {value!r}; expected e.g. 120/minute')
+    return int(count), int(count) / PERIODS[period]
+
+
+def parse_limits(value):
+    """'listing=120/minute,report=5/minute' -> {'listing': '120/minute', ...}."""
+    limits = {}
+    for item in value.split(','):
+        if item.strip():
+            blueprint, _, limit = item.partition('=')
+            parse_limit(limit)
+            limits[blueprint.strip()] = limit.strip()
+    return limits
+
+
+def take(tokens, updated_at, now, capacity, rate, cost):
+    """Refill a bucket to ``now`` and try to take ``cost`` tokens. Returns (allowed, tokens)."""
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= cost:
+        return True, tokens - cost
+    return False, tokens
+
+
+class InProcessBackend:
+    """
+    Buckets local to the worker process. An idle bucket is dropped once it
+    would have refilled, which is the same as a new one.
+    """
+
+    def __init__(self, maxsize=100000, clock=time.monotonic):
+        self._buckets = TTLCache(maxsize=maxsize, ttl=60.0, clock=clock)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost):
+        with self._lock:
+            now = self._clock()
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            allowed, tokens = take(tokens, updated_at, now, capacity, rate, cost)
+            self._buckets.set(key, (tokens, now), ttl=capacity / rate)
+        return allowed, tokens
+
+
+# KEYS[1] bucket; ARGV capacity, rate, cost, now. Returns {allowed, tokens}.
+TOKEN_BUCKET_SCRIPT = '''
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+'''
+
+
+class SharedStoreBackend:
+    """
+    Buckets in a store shared by all workers. ``client`` needs a Redis-style
+    eval(script, numkeys, *args); the refill and take run atomically in
+    TOKEN_BUCKET_SCRIPT.
+    """
+
+    def __init__(self, client, prefix='stsc:rl:', clock=time.time):
+        self.client = client
+        self.prefix = prefix
+        self._clock = clock
+
+    def take(self, key, capacity, rate, cost):
+        allowed, tokens = self.client.eval(
+            TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, capacity, rate, cost, self._clock())
+        return bool(int(allowed)), float(tokens)
+
+
+class LocalBucketStore:
+    """
+    In-memory stand-in for a shared store client, for tests and
+    single-process development. eval() runs TOKEN_BUCKET_SCRIPT's logic in
+    Python; other scripts are not supported.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def eval(self, script, numkeys, key, capacity, rate, cost, now):
+        if script != TOKEN_BUCKET_SCRIPT:
+            raise NotImplementedError('LocalBucketStore only runs TOKEN_BUCKET_SCRIPT')
+        with self._lock:
+            tokens, updated_at = self._data.get(key, (capacity, now))
+            allowed, tokens = take(tokens, updated_at, now, capacity, rate, cost)
+            self._data[key] = (tokens, now)
+        return [int(allowed), repr(tokens)]
+
+
+class RateLimiter:
+    def __init__(self):
+        self.backend = None
+        self.limits = {}  # blueprint -> (capacity, tokens per second)
+
+    def configure(self, backend, limits=None):
+        self.backend = backend
+        if limits is not None:
+            self.limits = {blueprint: parse_limit(limit) for blueprint, limit in limits.items()}
+
+    def check(self, blueprint, client, cost=1):
+        """Returns None if allowed, else the seconds until the request would be."""
+        if self.backend is None or blueprint not in self.limits:
+            return None
+        capacity, rate = self.limits[blueprint]
+        cost = min(cost, capacity)
+        allowed, tokens = self.backend.take(f'{blueprint}:{client}', capacity, rate, cost)
+        if allowed:
+            return None
+        return (cost - tokens) / rate
+
+
+limiter = RateLimiter()
+
+
+def cost(weight):
+    """
+    Charge a view ``weight`` tokens per request instead of 1. ``weight`` may
+    be a callable, called in the request context before the view runs.
+    """
+    def decorator(fn):
+        fn.rate_limit_cost = weight
+        return fn
+    return decorator
+
+
+def budget(name, client=None):
+    """
+    Draw on the ``name`` budget instead of the blueprint's. ``client`` may be
+    a callable returning the bucket's client key, called in the request
+    context; it defaults to the JWT identity or remote address. Stacked
+    decorators are checked top to bottom, and a request must fit all of them.
+    """
+    def decorator(fn):
+        fn.rate_limit_budgets = [(name, client)] + getattr(fn, 'rate_limit_budgets', [])
+        return fn
+    return decorator
+
+
+def email_client():
+    """Client key for views that take an email in their JSON body, such as login."""
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    if isinstance(email, str) and email.strip():
+        return f'email:{email.strip().lower()}'
+    return _client()
+
+
+def _client():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # Invalid or expired tokens are rejected by the view itself
+        identity = None
+    if identity is not None:
+        return f'user:{identity}'
+    return f'ip:{request.remote_addr}'
+
+
+def _check_request():
+    if limiter.backend is None:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    budgets = getattr(view, 'rate_limit_budgets', None) or [(request.blueprint, None)]
+    weight = getattr(view, 'rate_limit_cost', 1)
+    if callable(weight):
+        weight = weight()
+    for name, client in budgets:
+        if name not in limiter.limits:
+            continue
+        retry_after = limiter.check(name, (client or _client)(), weight)
+        if retry_after is not None:
+            return _too_many_requests(name, retry_after)
+    return None
+
+
+def _too_many_requests(name, retry_after):
+    RATE_LIMITED.inc(blueprint=name)
+    seconds = max(1, math.ceil(retry_after))
+    response = jsonify({'message': f'Too many requests. Retry after {seconds} seconds.'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+
+def init_app(app):
+    """
+    Configure the limiter from app.config. RATE_LIMIT_BACKEND is 'memory'
+    (default) or 'none'; RATE_LIMITS maps blueprint and @budget names to
+    budgets such as '120/minute'. A shared store is plugged in with
+    limiter.configure(SharedStoreBackend(client)).
+    """
+    limits = app.config.get('RATE_LIMITS', DEFAULT_LIMITS)
+    if app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'none':
+        limiter.configure(None, limits)
+    else:
+        limiter.configure(InProcessBackend(), limits)
+    app.before_request(_check_request)
@@ -0,0 +1,120 @@
+"""
+Denormalized rating aggregates.
+
+listingRatings keeps a running rating sum, review count and 1-5 star
+histogram per listing. Read paths use these columns instead of running
+AVG() over listings -> bookings -> reviews. Writes update them in the
+same transaction as the review insert.
+"""
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Booking, ListingRating, Review
+from services import versions
+
+STAR_COLUMNS = {stars: f'stars_{stars}' for stars in range(1, 6)}
+
+
+def record_review(listing_id, rating):
+    """
+    Add one review to the listing's aggregates. Runs inside the caller's
+    transaction and does not commit.
+    """
+    star_column = getattr(ListingRating, STAR_COLUMNS[rating])
+    values = {
+        ListingRating.rating_sum: ListingRating.rating_sum + rating,
+        ListingRating.review_count: ListingRating.review_count + 1,
+        star_column: star_column + 1,
+    }
+    result = db.session.execute(
+        update(ListingRating).where(ListingRating.listing_id == listing_id).values(values)
+    )
+    if result.rowcount:
+        return
+
+    row = {'listing_id': listing_id, 'rating_sum': rating, 'review_count': 1}
+    row.update({column: int(stars == rating) for stars, column in STAR_COLUMNS.items()})
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(ListingRating).values(row))
+    except IntegrityError:
+        # Another transaction created the row first; add to it instead
+        db.session.execute(
+            update(ListingRating).where(ListingRating.listing_id == listing_id).values(values)
+        )
+
+
+def averages_statement(listing_ids):
+    return (
+        select(ListingRating.listing_id, ListingRating.rating_sum, ListingRating.review_count)
+        .where(ListingRating.listing_id.in_(listing_ids))
+    )
+
+
+def group_averages(rows):
+    """Fold averages_statement() rows into {listing_id: average rating}, like ListingRating.average_rating."""
+    return {
+        listing_id: round(rating_sum / review_count, 2)
+        for listing_id, rating_sum, review_count in rows
+        if review_count
+    }
+
+
+def average_ratings(listing_ids):
+    """Return {listing_id: average rating} for the listings that have reviews."""
+    if not listing_ids:
+        return {}
+    return group_averages(db.session.execute(averages_statement(listing_ids)))
+
+
+def _computed_aggregates():
+    """Aggregates rebuilt from the reviews table, keyed by listing id."""
+    columns = [
+        Booking.listing_id,
+        func.sum(Review.rating).label('rating_sum'),
+        func.count(Review.id).label('review_count'),
+    ]
+    columns += [
+        func.sum(case((Review.rating == stars, 1), else_=0)).label(column)
+        for stars, column in STAR_COLUMNS.items()
+    ]
+    rows = db.session.execute(
+        select(*columns)
+        .join(Review, Review.stay_id == Booking.id)
+        .group_by(Booking.listing_id)
+    )
+    return {row.listing_id: row._asdict() for row in rows}
+
+
+def reconcile(fix=False):
+    """
+    Compare stored aggregates with the reviews table.
+    Returns a list of (listing_id, stored, expected) for every drifted
+    listing. With fix=True the stored rows are corrected and committed.
+    """
+    fields = ['rating_sum', 'review_count'] + list(STAR_COLUMNS.values())
+    expected = _computed_aggregates()
+    stored = {
+        row.listing_id: {field: getattr(row, field) for field in fields}
+        for row in db.session.execute(select(ListingRating)).scalars()
+    }
+
+    drift = []
+    for listing_id in sorted(set(expected) | set(stored)):
+        want = {field: (expected[listing_id][field] if listing_id in expected else 0) for field in fields}
+        have = stored.get(listing_id)
+        if have != want and not (have is None and not want['review_count']):
+            drift.append((listing_id, have, want))
+
+    if fix and drift:
+        for listing_id, have, want in drift:
+            if have is None:
+                db.session.execute(insert(ListingRating).values(listing_id=listing_id, **want))
+            else:
+                db.session.execute(
+                    update(ListingRating).where(ListingRating.listing_id == listing_id).values(**want)
+                )
+        versions.listings_changed()
+        db.session.commit()
+
+    return drift
@@ -0,0 +1,127 @@
+"""
+Read-replica routing for read-only routes.
+
+When a replica is configured (DB_REPLICA_URL or DB_REPLICA_SERVER), it is
+added to SQLALCHEMY_BINDS as the 'replica' bind. Views decorated with
+@read_replica send their queries there through RoutingSession. Everything
+else uses the primary:
+
+- routes without the decorator, and work outside a request;
+- flushes and INSERT/UPDATE/DELETE statements, and any query after them in
+  the same request;
+- for DB_REPLICA_STICKY_SECONDS after a user's write, that user's reads,
+  so they see their own booking or review even if the replica lags.
+
+A write is remembered in the worker that handled it and in a short-lived
+signed cookie (STICKY_COOKIE) on its response, so a client that sends
+cookies back stays on the primary whichever worker serves its next request.
+Clients that drop cookies are only kept there by the worker they wrote
+through.
+
+Sticky requests neither read nor fill the listings response cache, and
+pages read from the replica are not cached while a write is recent (see
+services.cache), so a cached page built before a write is not served to
+the writer.
+"""
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, TimestampSigner
+
+from services import cache, metrics
+from services.cache import TTLCache
+
+REPLICA_BIND = 'replica'
+DEFAULT_STICKY_SECONDS = 10
+STICKY_COOKIE = 'stsc_wrote'
+
+REPLICA_STATEMENTS = metrics.Counter('db_replica_statements_total', 'Statements sent to the read replica.')
+
+_recent_writers = TTLCache(maxsize=100000, ttl=DEFAULT_STICKY_SECONDS)
+
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except Exception:
+        # No token was verified for this request
+        return None
+
+
+class RoutingSession(Session):
+    """db.session class that sends reads in @read_replica views to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or (clause is not None and clause.is_dml):
+                g.db_wrote = True
+            elif g.get('db_read_replica') and not g.get('db_wrote'):
+                REPLICA_STATEMENTS.inc()
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_configured():
+    return REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def sticky_seconds():
+    return current_app.config.get('DB_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+def _signer():
+    return TimestampSigner(current_app.config['JWT_SECRET_KEY'], salt='replica-sticky')
+
+
+def _wrote_recently(identity):
+    if _recent_writers.get(str(identity)) is not None:
+        return True
+    cookie = request.cookies.get(STICKY_COOKIE)
+    if not cookie:
+        return False
+    try:
+        # Also rejects cookies older than the sticky window
+        return _signer().unsign(cookie, max_age=sticky_seconds()).decode() == str(identity)
+    except BadSignature:
+        return False
+
+
+def route_reads_to_replica():
+    """
+    Send the rest of this request's reads to the replica, unless none is
+    configured or the current user wrote within the sticky window.
+    """
+    if replica_configured():
+        identity = _identity()
+        g.db_replica_sticky = identity is not None and _wrote_recently(identity)
+        g.db_read_replica = not g.db_replica_sticky
+
+
+def sticky():
+    """Whether this request reads from the primary because its user just wrote."""
+    return g.get('db_replica_sticky', False)
+
+
+def reading_replica():
+    """Whether this request's reads so far went to the replica."""
+    return bool(g.get('db_read_replica')) and not g.get('db_wrote')
+
+
+def _remember_writer(response):
+    if g.get('db_wrote'):
+        cache.listings_cache.note_write()
+        identity = _identity()
+        if identity is not None:
+            ttl = sticky_seconds()
+            _recent_writers.set(str(identity), True, ttl=ttl)
+            response.set_cookie(STICKY_COOKIE, _signer().sign(str(identity)).decode(), max_age=ttl,
+                                httponly=True, samesite='Lax', secure=request.is_secure)
+    return response
+
+
+def init_app(app):
+    if REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+        app.after_request(_remember_writer)
+        cache.listings_cache.recent_write_window = app.config.get('DB_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    else:
+        cache.listings_cache.recent_write_window = 0
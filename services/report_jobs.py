@@ -0,0 +1,231 @@
+"""
+Listing reports built in the background instead of inside the request.
+
+POST /v1/report/jobs stores a ReportJob and hands it to a small thread pool
+in the worker process. The job runs report_query() in its own app context
+and writes one JSON row per line to REPORT_JOBS_DIR/<id>.ndjson. Next to
+it, <id>.idx holds the byte offset of every row as unsigned 64-bit
+integers in the host's byte order, plus the file size at the end. A result
+page is therefore two seeks and two reads, and the stored JSON is passed
+through without being parsed again.
+
+The pool takes at most REPORT_JOB_WORKERS running plus REPORT_JOB_MAX_QUEUED
+waiting jobs per worker process; beyond that, new jobs are refused.
+Results live on the local disk of the host that ran the job. `flask
+reports purge` deletes old jobs and their files.
+
+A job lives only in the pool of the process that created it, so one whose
+worker exits stays queued or running in the table. Jobs queued or running
+for longer than REPORT_JOB_TIMEOUT seconds are marked failed when they are
+polled and before a purge, so clients stop waiting and purge removes them.
+"""
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from models import db, ReportJob
+from services.reports import STREAM_BATCH_SIZE, report_query, report_row
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 8
+DEFAULT_TIMEOUT = 3600
+OFFSET_SIZE = array('Q').itemsize
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def jobs_dir():
+    directory = current_app.config.get('REPORT_JOBS_DIR') or os.path.join(tempfile.gettempdir(), 'stsc-report-jobs')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def result_paths(job_id):
+    base = os.path.join(jobs_dir(), job_id)
+    return base + '.ndjson', base + '.idx'
+
+
+def _pool():
+    # Created on first use, so each forked worker gets its own threads
+    global _executor, _slots
+    with _pool_lock:
+        if _executor is None:
+            workers = current_app.config.get('REPORT_JOB_WORKERS', DEFAULT_WORKERS)
+            max_queued = current_app.config.get('REPORT_JOB_MAX_QUEUED', DEFAULT_MAX_QUEUED)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-job')
+            _slots = threading.BoundedSemaphore(workers + max_queued)
+        return _executor, _slots
+
+
+def submit(user_id, country, city, fields):
+    """Create and queue a job. Returns the job, or None if the pool is full."""
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        return None
+    try:
+        job = ReportJob(
+            id=uuid.uuid4().hex, user_id=int(user_id), status=QUEUED, country=country, city=city,
+            fields=','.join(fields), created_at=_now()
+        )
+        db.session.add(job)
+        db.session.commit()
+        executor.submit(_run, current_app._get_current_object(), job.id)
+    except Exception:
+        slots.release()
+        raise
+    return job
+
+
+def _run(app, job_id):
+    try:
+        with app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            if job is None or job.status != QUEUED:
+                # Purged, or given up on as stale while it waited
+                return
+            job.status = RUNNING
+            job.started_at = _now()
+            db.session.commit()
+            try:
+                row_count = write_result(job)
+            except Exception as e:
+                logger.exception('Report job failed', extra={'job_id': job_id})
+                db.session.rollback()
+                job = db.session.get(ReportJob, job_id)
+                job.status = FAILED
+                job.error = str(e)[:500]
+            else:
+                job.status = DONE
+                job.row_count = row_count
+            job.finished_at = _now()
+            db.session.commit()
+    finally:
+        _slots.release()
+
+
+def write_result(job):
+    """Write the job's rows and offsets index. Returns the number of rows."""
+    fields = tuple(job.fields.split(','))
+    data_path, index_path = result_paths(job.id)
+    offsets = array('Q')
+    dumps = current_app.json.dumps
+    with open(data_path + '.tmp', 'wb') as data:
+        for listing in report_query(job.country, job.city, fields).yield_per(STREAM_BATCH_SIZE):
+            offsets.append(data.tell())
+            data.write(dumps(report_row(listing, fields)).encode() + b'\n')
+        offsets.append(data.tell())
+    with open(index_path + '.tmp', 'wb') as index:
+        offsets.tofile(index)
+    # Readers only ever see complete files
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(index_path + '.tmp', index_path)
+    return len(offsets) - 1
+
+
+def read_rows(job_id, start, count):
+    """Raw JSON lines of rows start .. start+count-1 (fewer at the end)."""
+    data_path, index_path = result_paths(job_id)
+    offsets = array('Q')
+    with open(index_path, 'rb') as index:
+        index.seek(start * OFFSET_SIZE)
+        offsets.frombytes(index.read((count + 1) * OFFSET_SIZE))
+    if len(offsets) < 2:
+        return []
+    with open(data_path, 'rb') as data:
+        data.seek(offsets[0])
+        chunk = data.read(offsets[-1] - offsets[0])
+    return chunk.splitlines()
+
+
+def _stale_condition(timeout):
+    cutoff = _now() - timedelta(seconds=timeout)
+    return or_(
+        and_(ReportJob.status == QUEUED, ReportJob.created_at < cutoff),
+        and_(ReportJob.status == RUNNING, ReportJob.started_at < cutoff),
+    )
+
+
+def fail_stale(timeout=None, job_id=None):
+    """
+    Mark jobs queued or running for longer than ``timeout`` seconds (default
+    REPORT_JOB_TIMEOUT) as failed; only ``job_id`` if given. Commits.
+    Returns the number of jobs marked.
+    """
+    if timeout is None:
+        timeout = current_app.config.get('REPORT_JOB_TIMEOUT', DEFAULT_TIMEOUT)
+    statement = update(ReportJob).where(_stale_condition(timeout))
+    if job_id is not None:
+        statement = statement.where(ReportJob.id == job_id)
+    result = db.session.execute(
+        statement.values(
+            status=FAILED, finished_at=_now(),
+            error=f'Report job did not finish within {timeout} seconds; the worker running it may have stopped.'
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def fail_if_stale(job):
+    """``job``, marked failed first if it is stale."""
+    if job.status in (QUEUED, RUNNING) and fail_stale(job_id=job.id):
+        db.session.refresh(job)
+    return job
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'country': job.country,
+        'city': job.city,
+        'fields': job.fields.split(','),
+        'row_count': job.row_count,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def purge(max_age_hours, batch_size=500):
+    """
+    Delete finished jobs older than max_age_hours, with their files; stale
+    queued or running jobs are marked failed first. Returns the count.
+    """
+    fail_stale()
+    cutoff = _now() - timedelta(hours=max_age_hours)
+    deleted = 0
+    while True:
+        jobs = db.session.execute(
+            select(ReportJob)
+            .where(ReportJob.created_at < cutoff, ReportJob.status.in_((DONE, FAILED)))
+            .limit(batch_size)
+        ).scalars().all()
+        if not jobs:
+            return deleted
+        for job in jobs:
+            for path in result_paths(job.id):
+                if os.path.exists(path):
+                    os.remove(path)
+            db.session.delete(job)
+        db.session.commit()
+        deleted += len(jobs)
+
@@ -0,0 +1,83 @@
+"""
+Per-listing rating report: the query and row formats shared by
+GET /report_listings and the background report jobs.
+"""
+from sqlalchemy import func
+
+from models import db, Listing, ListingRating
+
+REPORT_FIELDS = ('id', 'title', 'country', 'city', 'price', 'average_rating', 'review_count', 'rating_histogram')
+STREAM_BATCH_SIZE = 1000
+
+
+def report_query(country=None, city=None, fields=REPORT_FIELDS):
+    """
+    Per-listing report rows. listingRatings is the materialized part of the
+    report: it is kept current by insert_review, so no GROUP BY runs here.
+    Only the columns behind ``fields`` are selected.
+    """
+    # Average rating comes from the stored aggregates instead of AVG() over bookings and reviews
+    average_rating = (
+        ListingRating.rating_sum * 1.0 / func.nullif(ListingRating.review_count, 0)
+    ).label('average_rating')
+
+    columns = {
+        'title': [Listing.title],
+        'country': [Listing.country],
+        'city': [Listing.city],
+        'price': [Listing.price],
+        'average_rating': [average_rating],
+        'review_count': [func.coalesce(ListingRating.review_count, 0).label('review_count')],
+        'rating_histogram': [ListingRating.stars_1, ListingRating.stars_2, ListingRating.stars_3,
+                             ListingRating.stars_4, ListingRating.stars_5],
+    }
+    query = (
+        db.session.query(Listing.id, *(column for name in fields for column in columns.get(name, ())))
+        .outerjoin(ListingRating, ListingRating.listing_id == Listing.id)
+        .order_by(average_rating.desc(), Listing.id)  # Order by average rating in descending order
+    )
+
+    if country:
+        query = query.filter(Listing.country == country)
+    if city:
+        query = query.filter(Listing.city == city)
+
+    return query
+
+
+def _average_rating(listing, missing):
+    return round(float(listing.average_rating), 2) if listing.average_rating is not None else missing
+
+
+def report_row(listing, fields=REPORT_FIELDS):
+    row = {}
+    for name in fields:
+        if name == 'average_rating':
+            row[name] = _average_rating(listing, "No reviews")
+        elif name == 'rating_histogram':
+            row[name] = {str(stars): getattr(listing, f'stars_{stars}') or 0 for stars in range(1, 6)}
+        else:
+            row[name] = getattr(listing, name)
+    return row
+
+
+def csv_columns(fields=REPORT_FIELDS):
+    columns = []
+    for name in fields:
+        if name == 'rating_histogram':
+            columns.extend(f'stars_{stars}' for stars in range(1, 6))
+        else:
+            columns.append(name)
+    return columns
+
+
+def csv_row(listing, fields=REPORT_FIELDS):
+    values = []
+    for name in fields:
+        if name == 'average_rating':
+            values.append(_average_rating(listing, ''))
+        elif name == 'rating_histogram':
+            values.extend(getattr(listing, f'stars_{stars}') or 0 for stars in range(1, 6))
+        else:
+            values.append(getattr(listing, name))
+    return values
@@ -0,0 +1,65 @@
+"""
+Role and token-version claims for access tokens.
+
+login puts the user's role and token version into the JWT, so require_role
+can authorize from the claims without loading the user. Tokens are revoked
+by bumping users.token_version. The current version is read through a
+small per-process TTL cache, so a revocation reaches every worker within
+TOKEN_VERSION_TTL seconds.
+"""
+from flask import current_app
+from sqlalchemy import select, update
+
+from models import db, User
+from services.cache import TTLCache
+
+DEFAULT_TOKEN_VERSION_TTL = 30
+
+_versions = TTLCache(maxsize=10000, ttl=DEFAULT_TOKEN_VERSION_TTL)
+
+
+def token_claims(user):
+    return {'role': user.role, 'ver': user.token_version or 0}
+
+
+def token_version_statement(user_id):
+    return select(User.token_version).where(User.id == int(user_id))
+
+
+def cached_token_version(user_id):
+    return _versions.get(int(user_id))
+
+
+def remember_token_version(user_id, version, ttl=DEFAULT_TOKEN_VERSION_TTL):
+    _versions.set(int(user_id), version, ttl=ttl)
+
+
+def current_token_version(user_id):
+    """Current token version of a user, or None if the user does not exist."""
+    version = cached_token_version(user_id)
+    if version is None:
+        version = db.session.execute(token_version_statement(user_id)).scalar()
+        if version is None:
+            return None
+        remember_token_version(user_id, version, current_app.config.get('TOKEN_VERSION_TTL', DEFAULT_TOKEN_VERSION_TTL))
+    return version
+
+
+def token_revoked(jwt_header, jwt_payload):
+    """
+    flask-jwt-extended blocklist loader: a token is revoked once its version
+    is behind the user's, or the user is gone. Tokens issued before
+    versions were added carry no 'ver' and count as version 0, so they are
+    revoked with the first revocation.
+    """
+    return jwt_payload.get('ver', 0) != current_token_version(jwt_payload['sub'])
+
+
+def revoke_tokens(user_id):
+    """Invalidate every token issued to the user so far. Commits."""
+    user_id = int(user_id)
+    db.session.execute(
+        update(User).where(User.id == user_id).values(token_version=User.token_version + 1)
+    )
+    db.session.commit()
+    _versions.delete(user_id)
@@ -0,0 +1,101 @@
+"""
+Version stamps and weak ETags for conditional GETs.
+
+A read endpoint combines the max id of its table (which moves on every
+insert) with a named counter in changeCounters (which writes that update
+existing rows bump inside their own transaction) into a stamp, and hashes the stamp and the request's query into a weak ETag. The
+stamp is one small query, so If-None-Match can be answered with 304 before
+the endpoint runs its real queries.
+
+Counters written by many transactions (listings) are split into shards and
+a write bumps one shard at random, so concurrent writers do not queue on a
+single row. The stamp is the sum of the shards, which grows on every write.
+"""
+import hashlib
+import random
+
+from flask import Response, request
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Booking, ChangeCounter, Listing
+
+LISTINGS = 'listings'
+LISTINGS_SHARDS = 8
+
+
+def user_bookings(user_id):
+    return f'bookings:user:{int(user_id)}'
+
+
+def _shard_names(name, shards):
+    return [name] if shards == 1 else [f'{name}:{shard}' for shard in range(shards)]
+
+
+def bump(name, shards=1):
+    """
+    Bump a counter. Runs inside the caller's transaction and does not
+    commit, so the new version becomes visible together with the write.
+    """
+    shard_name = random.choice(_shard_names(name, shards))
+    result = db.session.execute(
+        update(ChangeCounter).where(ChangeCounter.name == shard_name).values(version=ChangeCounter.version + 1)
+    )
+    if result.rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(ChangeCounter).values(name=shard_name, version=1))
+    except IntegrityError:
+        # Another transaction created the row first
+        db.session.execute(
+            update(ChangeCounter).where(ChangeCounter.name == shard_name).values(version=ChangeCounter.version + 1)
+        )
+
+
+def listings_changed():
+    bump(LISTINGS, LISTINGS_SHARDS)
+
+
+def bookings_changed(user_id):
+    """For writes that change how a user's existing bookings are listed (e.g. a review)."""
+    bump(user_bookings(user_id))
+
+
+def stamp(name, max_id_query, shards=1):
+    """(counter version, max id) in one round trip."""
+    version = (
+        select(func.coalesce(func.sum(ChangeCounter.version), 0))
+        .where(ChangeCounter.name.in_(_shard_names(name, shards)))
+        .scalar_subquery()
+    )
+    return tuple(db.session.execute(select(version, max_id_query.scalar_subquery())).one())
+
+
+def weak_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def _normalized_query():
+    return sorted((key, value) for key, value in request.args.items(multi=True) if value != '')
+
+
+def listings_etag():
+    version, max_id = stamp(LISTINGS, select(func.max(Listing.id)), LISTINGS_SHARDS)
+    return weak_etag(LISTINGS, version, max_id, _normalized_query())
+
+
+def bookings_etag(user_id, today=None):
+    """Pass today when the response depends on the date (status=upcoming|past)."""
+    name = user_bookings(user_id)
+    version, max_id = stamp(name, select(func.max(Booking.id)).where(Booking.issuer_guest_id == int(user_id)))
+    return weak_etag(name, version, max_id, _normalized_query(), today)
+
+
+def not_modified(etag):
+    """A 304 response if the request's If-None-Match matches etag, else None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
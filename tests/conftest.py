@@ -0,0 +1,116 @@
+"""
+Shared fixtures: the real app from create_app() on a temporary SQLite
+database, with rate limits, the response cache and the hashing pool off.
+"""
+import os
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+# app.py builds an app at import time, so it needs a configuration too
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-that-is-long-enough-for-hs256')
+os.environ.setdefault('SWAGGER_UI', 'false')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from models import db, Listing, User  # noqa: E402
+
+PASSWORD = 'test-password'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "test.db"}')
+    monkeypatch.setenv('RATE_LIMIT_BACKEND', 'none')
+    monkeypatch.setenv('RESPONSE_CACHE_BACKEND', 'none')
+    monkeypatch.setenv('PASSWORD_HASH_WORKERS', '0')
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setenv('REPORT_JOBS_DIR', str(tmp_path / 'report-jobs'))
+
+    from app import create_app
+    from services import idempotency, replica, tokens
+
+    # Per-process caches outlive the app; each test starts on an empty database
+    for per_process_cache in (tokens._versions, idempotency._results, replica._recent_writers):
+        per_process_cache.clear()
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    """Ids of a host, a guest and an admin; all use PASSWORD."""
+    from services.passwords import hash_password
+
+    with app.app_context():
+        password_hash = hash_password(PASSWORD)
+        accounts = {role: User(name=role, email=f'{role}@test.local', password=password_hash, role=role)
+                    for role in ('host', 'guest', 'admin')}
+        db.session.add_all(accounts.values())
+        db.session.commit()
+        return {role: user.id for role, user in accounts.items()}
+
+
+@pytest.fixture
+def auth_header(app):
+    """auth_header(user_id, role) -> Authorization header with a current token."""
+    def make(user_id, role):
+        with app.app_context():
+            token = create_access_token(identity=str(user_id), additional_claims={'role': role, 'ver': 0})
+        return {'Authorization': f'Bearer {token}'}
+    return make
+
+
+@pytest.fixture
+def make_listings(app, users):
+    """make_listings(n) inserts n listings of the host; returns their ids."""
+    def make(count, available_from=date(2025, 1, 1), available_to=date(2025, 12, 31)):
+        with app.app_context():
+            listings = [
+                Listing(user_id=users['host'], title=f'Listing {i}', numberOfPeople=2, country='Turkey',
+                        city='Izmir', price=100 + i, availableFrom=available_from, availableTo=available_to)
+                for i in range(count)
+            ]
+            db.session.add_all(listings)
+            db.session.commit()
+            return [listing.id for listing in listings]
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """
+    with count_queries() as queries: ... counts the SQL statements sent in
+    the block; read queries.count afterwards.
+    """
+    @contextmanager
+    def counting():
+        class Counter:
+            count = 0
+
+        def before_cursor_execute(*args):
+            Counter.count += 1
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield Counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return counting
@@ -0,0 +1,108 @@
+"""
+The async routes in asgi.py, on sqlite+aiosqlite, must answer like the
+Flask routes they mirror.
+"""
+import asyncio
+import gzip
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('a2wsgi')
+
+
+@pytest.fixture
+def asgi(app, monkeypatch):
+    import asgi
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(asgi.async_database_url(app.config['SQLALCHEMY_DATABASE_URI']))
+    monkeypatch.setattr(asgi, 'engine', engine)
+    monkeypatch.setattr(asgi, 'Session', async_sessionmaker(engine, expire_on_commit=False))
+    yield asgi
+    asyncio.run(engine.dispose())
+
+
+def _get(asgi, path, query=None, headers=None):
+    """(status, headers, body) of a GET to the ASGI app."""
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path,
+        'query_string': urlencode(query or {}).encode(),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start, body = messages
+    return start['status'], {name.decode(): value.decode() for name, value in start['headers']}, body['body']
+
+
+def _assert_same(asgi, client, path, query=None, headers=None):
+    status, _, body = _get(asgi, path, query, headers)
+    response = client.get(path, query_string=query, headers=headers)
+    assert (status, json.loads(body)) == (response.status_code, response.get_json())
+    return status, json.loads(body)
+
+
+def test_async_listings_match_flask(asgi, client, make_listings):
+    make_listings(25)
+    _assert_same(asgi, client, '/v1/listing/listings')
+    _assert_same(asgi, client, '/v1/listing/listings', {'page': 2, 'per_page': 10})
+    _assert_same(asgi, client, '/v1/listing/listings', {'fields': 'title,price', 'per_page': 5})
+    _, first = _assert_same(asgi, client, '/v1/listing/listings', {'cursor': '', 'per_page': 10})
+    _assert_same(asgi, client, '/v1/listing/listings', {'cursor': first['meta']['next_cursor'], 'per_page': 10})
+    assert _assert_same(asgi, client, '/v1/listing/listings', {'per_page': 500})[0] == 400
+    assert _assert_same(asgi, client, '/v1/listing/listings', {'cursor': 'zzz'})[0] == 400
+
+
+def test_async_bookings_match_flask(asgi, client, users, auth_header, make_listings):
+    listing_id, = make_listings(1)
+    headers = auth_header(users['guest'], 'guest')
+    for day in (10, 14, 18):
+        body = {'listing_id': listing_id, 'dateFrom': f'2025-06-{day}', 'dateTo': f'2025-06-{day + 1}',
+                'namesOfPeople': 'Guest'}
+        assert client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code == 201
+
+    _, everything = _assert_same(asgi, client, '/v1/booking/get_bookings', headers=headers)
+    assert len(everything['bookings']) == 3
+    _assert_same(asgi, client, '/v1/booking/get_bookings', {'page': 2, 'per_page': 2}, headers)
+    _, first = _assert_same(asgi, client, '/v1/booking/get_bookings', {'cursor': '', 'per_page': 2}, headers)
+    _assert_same(asgi, client, '/v1/booking/get_bookings', {'cursor': first['meta']['next_cursor'], 'per_page': 2},
+                 headers)
+    _assert_same(asgi, client, '/v1/booking/get_bookings', {'fields': 'stay_id,listing'}, headers)
+
+
+def test_async_auth_errors_match_flask(asgi, client, users, auth_header):
+    path = '/v1/booking/get_bookings'
+    assert _assert_same(asgi, client, path)[0] == 401
+    assert _assert_same(asgi, client, path, headers={'Authorization': 'Token abc'})[0] == 401
+    assert _assert_same(asgi, client, path, headers={'Authorization': 'Bearer junk'})[0] == 422
+    assert _assert_same(asgi, client, '/v1/listing/listings', headers={'Authorization': 'Bearer junk'})[0] == 422
+
+    headers = auth_header(users['guest'], 'guest')
+    assert client.post('/v1/auth/revoke_tokens', headers=headers).status_code == 200
+    assert _assert_same(asgi, client, path, headers=headers)[0] == 401
+    assert _assert_same(asgi, client, '/v1/listing/listings', headers=headers)[0] == 401
+
+
+def test_async_responses_are_compressed_like_flask(asgi, client, make_listings):
+    make_listings(50)
+    query = {'per_page': 50}
+    status, headers, body = _get(asgi, '/v1/listing/listings', query, {'Accept-Encoding': 'gzip'})
+    response = client.get('/v1/listing/listings', query_string=query, headers={'Accept-Encoding': 'gzip'})
+    assert status == 200
+    assert headers['content-encoding'] == response.headers['Content-Encoding'] == 'gzip'
+    assert headers['vary'] == response.headers['Vary']
+    assert json.loads(gzip.decompress(body)) == json.loads(gzip.decompress(response.data))
+
+    _, headers, body = _get(asgi, '/v1/listing/listings', query, {'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in headers
+    assert int(headers['content-length']) == len(body)
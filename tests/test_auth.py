@@ -0,0 +1,61 @@
+from services import passwords
+
+PASSWORD = 'test-password'
+
+
+def _login(client, role):
+    response = client.post('/v1/auth/login', json={'email': f'{role}@test.local', 'password': PASSWORD})
+    assert response.status_code == 200
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+
+
+def test_revoked_token_is_rejected_by_every_protected_route(client, users):
+    old = _login(client, 'guest')
+    assert client.get('/v1/booking/get_bookings', headers=old).status_code == 200
+
+    assert client.post('/v1/auth/revoke_tokens', headers=old).status_code == 200
+
+    assert client.get('/v1/booking/get_bookings', headers=old).status_code == 401
+    assert client.post('/v1/auth/revoke_tokens', headers=old).status_code == 401
+    assert client.post('/v1/booking/insert_booking', json={}, headers=old).status_code == 401
+
+    new = _login(client, 'guest')
+    assert client.get('/v1/booking/get_bookings', headers=new).status_code == 200
+
+
+def test_require_role_uses_the_role_claim(client, users):
+    assert client.get('/v1/report/report_listings', headers=_login(client, 'guest')).status_code == 403
+    assert client.get('/v1/report/report_listings', headers=_login(client, 'admin')).status_code == 200
+
+
+def test_login_hashes_on_a_pool_that_is_not_forked_from_the_worker(app, client, users, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_WORKERS', 1)
+    passwords.warm_up(app.config)
+    pool = passwords._executor
+    try:
+        assert pool._mp_context.get_start_method() != 'fork'
+        assert len(pool._processes) == 1
+        assert client.get('/v1/booking/get_bookings', headers=_login(client, 'guest')).status_code == 200
+        assert passwords._executor is pool
+    finally:
+        pool.shutdown()
+        passwords._executor = None
+
+
+def test_tokens_without_a_version_are_revoked_with_the_first_revocation(app, client, users):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity=str(users['guest']), additional_claims={'role': 'guest'})
+    legacy = {'Authorization': f'Bearer {token}'}
+    assert client.get('/v1/booking/get_bookings', headers=legacy).status_code == 200
+
+    assert client.post('/v1/auth/revoke_tokens', headers=_login(client, 'guest')).status_code == 200
+    assert client.get('/v1/booking/get_bookings', headers=legacy).status_code == 401
+
+
+def test_token_version_ttl_is_read_from_the_environment(app, monkeypatch):
+    from app import create_app
+
+    monkeypatch.setenv('TOKEN_VERSION_TTL', '5')
+    assert create_app().config['TOKEN_VERSION_TTL'] == 5
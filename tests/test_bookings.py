@@ -0,0 +1,122 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from models import db, Booking, ListingBookedRange, Review
+
+THREADS = 16
+
+
+def test_parallel_bookings_of_the_same_nights_book_once(app, users, auth_header, make_listings):
+    listing_id, = make_listings(1)
+    headers = auth_header(users['guest'], 'guest')
+    body = {'listing_id': listing_id, 'dateFrom': '2025-06-10', 'dateTo': '2025-06-12', 'namesOfPeople': 'Guest'}
+    start = threading.Barrier(THREADS)
+    statuses = []
+
+    def book():
+        client = app.test_client()
+        start.wait()
+        statuses.append(client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code)
+
+    threads = [threading.Thread(target=book) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [400] * (THREADS - 1)
+    with app.app_context():
+        assert len(db.session.execute(select(Booking.id).where(Booking.listing_id == listing_id)).all()) == 1
+        ranges = db.session.execute(
+            select(ListingBookedRange.date_from, ListingBookedRange.date_to)
+            .where(ListingBookedRange.listing_id == listing_id)
+            .order_by(ListingBookedRange.date_from)
+        ).all()
+    assert [tuple(row) for row in ranges] == [(date(2025, 6, 10), date(2025, 6, 12))]
+
+
+def test_overlapping_booking_is_rejected(client, users, auth_header, make_listings):
+    listing_id, = make_listings(1)
+    headers = auth_header(users['guest'], 'guest')
+    first = {'listing_id': listing_id, 'dateFrom': '2025-06-10', 'dateTo': '2025-06-12', 'namesOfPeople': 'Guest'}
+    overlapping = dict(first, dateFrom='2025-06-12', dateTo='2025-06-14')
+    assert client.post('/v1/booking/insert_booking', json=first, headers=headers).status_code == 201
+    response = client.post('/v1/booking/insert_booking', json=overlapping, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['unavailable_dates'] == [{'from': '2025-06-12', 'to': '2025-06-12'}]
+
+
+@pytest.fixture
+def stays(app, users, make_listings):
+    """Ids of the guest's past, current and future stays; the past one is reviewed."""
+    listing_id, = make_listings(1)
+    today = date.today()
+    with app.app_context():
+        stays = {
+            name: Booking(listing_id=listing_id, issuer_guest_id=users['guest'], names_of_people='Guest',
+                          date_from=today + timedelta(days=start), date_to=today + timedelta(days=end))
+            for name, start, end in (('past', -10, -8), ('current', -1, 1), ('future', 5, 7))
+        }
+        db.session.add_all(stays.values())
+        db.session.flush()
+        db.session.add(Review(stay_id=stays['past'].id, guest_id=users['guest'], rating=5, comment='Nice'))
+        db.session.commit()
+        return {name: stay.id for name, stay in stays.items()}
+
+
+def _stay_ids(client, headers, **query):
+    response = client.get('/v1/booking/get_bookings', query_string=query, headers=headers)
+    assert response.status_code == 200
+    return sorted(booking['stay_id'] for booking in response.get_json()['bookings'])
+
+
+def test_bookings_are_filtered_by_status(client, users, auth_header, stays):
+    headers = auth_header(users['guest'], 'guest')
+    assert _stay_ids(client, headers, status='upcoming') == sorted([stays['current'], stays['future']])
+    assert _stay_ids(client, headers, status='past') == [stays['past']]
+    assert _stay_ids(client, headers) == sorted(stays.values())
+    assert client.get('/v1/booking/get_bookings', query_string={'status': 'soon'}, headers=headers).status_code == 400
+
+
+def test_bookings_are_filtered_by_overlap_with_the_dates(client, users, auth_header, stays):
+    headers = auth_header(users['guest'], 'guest')
+    today = date.today()
+    assert _stay_ids(client, headers, dateFrom=str(today)) == sorted([stays['current'], stays['future']])
+    assert _stay_ids(client, headers, dateTo=str(today)) == sorted([stays['past'], stays['current']])
+    # Overlapping only the last night of the current stay
+    assert _stay_ids(client, headers, dateFrom=str(today + timedelta(days=1)),
+                     dateTo=str(today + timedelta(days=4))) == [stays['current']]
+    assert _stay_ids(client, headers, dateFrom=str(today + timedelta(days=2)),
+                     dateTo=str(today + timedelta(days=4))) == []
+
+    for query in ({'dateFrom': '2025-13-01'}, {'dateFrom': str(today), 'dateTo': str(today - timedelta(days=1))}):
+        assert client.get('/v1/booking/get_bookings', query_string=query, headers=headers).status_code == 400
+
+
+def test_bookings_report_whether_they_were_reviewed(client, users, auth_header, stays):
+    headers = auth_header(users['guest'], 'guest')
+    response = client.get('/v1/booking/get_bookings', query_string={'fields': 'stay_id,reviewed'}, headers=headers)
+    reviewed = {booking['stay_id']: booking['reviewed'] for booking in response.get_json()['bookings']}
+    assert reviewed == {stays['past']: True, stays['current']: False, stays['future']: False}
+
+
+def test_bookings_cursor_pages_walk_every_booking_once(client, users, auth_header, stays):
+    headers = auth_header(users['guest'], 'guest')
+    seen, cursor = [], ''
+    while cursor is not None:
+        response = client.get('/v1/booking/get_bookings', query_string={'cursor': cursor, 'per_page': 2},
+                              headers=headers)
+        body = response.get_json()
+        seen += [booking['stay_id'] for booking in body['bookings']]
+        cursor = body['meta']['next_cursor']
+    assert seen == sorted(stays.values(), reverse=True)
+
+    # Filters apply before seeking
+    response = client.get('/v1/booking/get_bookings', query_string={'cursor': '', 'per_page': 1, 'status': 'past'},
+                          headers=headers)
+    assert [booking['stay_id'] for booking in response.get_json()['bookings']] == [stays['past']]
+    assert response.get_json()['meta']['has_next'] is False
+    assert client.get('/v1/booking/get_bookings', query_string={'cursor': 'zzz'}, headers=headers).status_code == 400
@@ -0,0 +1,50 @@
+from werkzeug.datastructures import MultiDict
+
+from services.cache import InProcessBackend, LocalStore, ResponseCache, SharedStoreBackend, TTLCache
+
+
+def test_make_key_sorts_and_drops_blank_parameters():
+    args = MultiDict([('per_page', '10'), ('city', ''), ('country', 'Turkey')])
+    assert ResponseCache.make_key('listings', args) == 'listings?country=Turkey&per_page=10'
+
+
+def test_entry_is_a_miss_once_its_stamp_changes():
+    cache = ResponseCache('listings', InProcessBackend())
+    assert cache.lookup('page1', 'v1') is None
+    cache.store('page1', 'body', 'v1')
+    assert cache.lookup('page1', 'v1') == 'body'
+    assert cache.lookup('page1', 'v2') is None
+
+    cache.store('page1', 'newer', 'v2')
+    assert cache.lookup('page1', 'v2') == 'newer'
+
+
+def test_shared_store_entries_are_seen_by_every_worker():
+    store = LocalStore()
+    worker_a = ResponseCache('listings', SharedStoreBackend(store))
+    worker_b = ResponseCache('listings', SharedStoreBackend(store))
+    worker_a.store('page1', {'body': '[]'}, 'v1')
+    assert worker_b.lookup('page1', 'v1') == {'body': '[]'}
+    assert worker_b.lookup('page1', 'v2') is None
+
+
+def test_replica_pages_are_not_stored_right_after_a_write():
+    cache = ResponseCache('listings', InProcessBackend(), recent_write_window=10)
+    cache.note_write()
+    cache.store('page1', 'stale', 'v1', from_replica=True)
+    assert cache.lookup('page1', 'v1') is None
+    cache.store('page1', 'fresh', 'v1')
+    assert cache.lookup('page1', 'v1') == 'fresh'
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    now[0] = 11
+    assert cache.get('a') is None
@@ -0,0 +1,50 @@
+import gzip
+
+import pytest
+
+from services import compression
+
+
+@pytest.fixture
+def big_page(make_listings):
+    """Query string of a /listings page well over COMPRESSION_MIN_SIZE."""
+    make_listings(50)
+    return {'per_page': 50}
+
+
+def _get(client, query, accept_encoding):
+    return client.get('/v1/listing/listings', query_string=query, headers={'Accept-Encoding': accept_encoding})
+
+
+def test_gzip_is_negotiated(client, big_page):
+    plain = _get(client, big_page, 'identity')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    for accept_encoding in ('gzip', 'deflate, gzip;q=0.8', '*'):
+        response = _get(client, big_page, accept_encoding)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data) == plain.data
+    assert 'Content-Encoding' not in _get(client, big_page, 'gzip;q=0').headers
+
+
+def test_brotli_is_preferred_when_installed(client, big_page):
+    brotli = pytest.importorskip('brotli')
+    response = _get(client, big_page, 'gzip, br')
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == _get(client, big_page, 'identity').data
+    assert _get(client, big_page, 'gzip, br;q=0.5').headers['Content-Encoding'] == 'gzip'
+
+
+def test_without_brotli_br_only_clients_get_identity(client, big_page, monkeypatch):
+    monkeypatch.setattr(compression, 'ENCODINGS', ('gzip',))
+    assert 'Content-Encoding' not in _get(client, big_page, 'br').headers
+
+
+def test_small_bodies_and_errors_are_not_compressed(client, make_listings):
+    make_listings(1)
+    assert 'Content-Encoding' not in _get(client, {}, 'gzip').headers
+    response = _get(client, {'fields': ','.join(f'unknown{i}' for i in range(200))}, 'gzip')
+    assert response.status_code == 400
+    assert len(response.data) > compression.DEFAULT_MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
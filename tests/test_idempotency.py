@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from models import db, Booking, IdempotencyKey
+from services import availability, idempotency
+
+
+@pytest.fixture
+def booking_request(users, auth_header, make_listings):
+    """(headers with an Idempotency-Key, body) of a valid booking."""
+    listing_id, = make_listings(1)
+    headers = {**auth_header(users['guest'], 'guest'), idempotency.HEADER: 'key-1'}
+    body = {'listing_id': listing_id, 'dateFrom': '2025-06-10', 'dateTo': '2025-06-12', 'namesOfPeople': 'Guest'}
+    return headers, body
+
+
+def _bookings(app):
+    with app.app_context():
+        return db.session.execute(select(func.count(Booking.id))).scalar()
+
+
+def _record_id(app, users):
+    with app.test_request_context():
+        return idempotency.record_id(users['guest'], 'booking.insert_booking', 'key-1')
+
+
+def _add_claim(app, users, expires_in):
+    with app.app_context():
+        db.session.add(IdempotencyKey(id=_record_id(app, users), request_hash='pending',
+                                      expires_at=idempotency._now() + timedelta(seconds=expires_in)))
+        db.session.commit()
+
+
+def test_retry_is_replayed_without_running_again(app, client, booking_request):
+    headers, body = booking_request
+    first = client.post('/v1/booking/insert_booking', json=body, headers=headers)
+    idempotency._results.clear()  # replay from the table, as another worker would
+    second = client.post('/v1/booking/insert_booking', json=body, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_json() == first.get_json()
+    assert _bookings(app) == 1
+
+
+def test_key_reused_for_another_body_is_rejected(app, client, booking_request):
+    headers, body = booking_request
+    assert client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code == 201
+    other = {**body, 'dateFrom': '2025-07-01', 'dateTo': '2025-07-02'}
+    assert client.post('/v1/booking/insert_booking', json=other, headers=headers).status_code == 422
+    assert _bookings(app) == 1
+
+
+def test_retry_while_the_first_request_runs_gets_409(app, client, users, booking_request):
+    headers, body = booking_request
+    _add_claim(app, users, expires_in=60)
+    response = client.post('/v1/booking/insert_booking', json=body, headers=headers)
+    assert response.status_code == 409
+    assert response.headers['Retry-After']
+    assert _bookings(app) == 0
+
+
+def test_stale_claim_is_taken_over(app, client, users, booking_request):
+    headers, body = booking_request
+    _add_claim(app, users, expires_in=-1)
+    assert client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code == 201
+    assert _bookings(app) == 1
+
+
+def test_server_error_releases_the_claim(app, client, users, booking_request, monkeypatch):
+    headers, body = booking_request
+
+    def fail(*args):
+        raise RuntimeError('database went away')
+
+    monkeypatch.setattr(availability, 'book_range', fail)
+    assert client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code == 500
+    with app.app_context():
+        assert db.session.get(IdempotencyKey, _record_id(app, users)) is None
+
+    monkeypatch.undo()
+    assert client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code == 201
+    assert _bookings(app) == 1
+
+
+def test_booking_is_not_committed_without_its_stored_response(app, client, booking_request, monkeypatch):
+    headers, body = booking_request
+    update = idempotency.update
+
+    def failing_update(*args):
+        raise RuntimeError('lost connection before the response was stored')
+
+    monkeypatch.setattr(idempotency, 'update', failing_update)
+    with pytest.raises(RuntimeError):
+        client.post('/v1/booking/insert_booking', json=body, headers=headers)
+    assert _bookings(app) == 0
+
+    monkeypatch.setattr(idempotency, 'update', update)
+    assert client.post('/v1/booking/insert_booking', json=body, headers=headers).status_code == 201
+    assert _bookings(app) == 1
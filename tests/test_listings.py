@@ -0,0 +1,193 @@
+import json
+from datetime import date
+
+from sqlalchemy import select
+
+from models import db, Listing, ListingBookedRange, ListingRating
+
+
+def _listings_queries(client, count_queries, per_page):
+    with count_queries() as queries:
+        response = client.get('/v1/listing/listings', query_string={'per_page': per_page})
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == per_page
+    assert queries.count > 0
+    return queries.count
+
+
+def test_listings_query_count_does_not_depend_on_per_page(app, client, make_listings, count_queries):
+    listing_ids = make_listings(60)
+    with app.app_context():
+        for listing_id in listing_ids:
+            db.session.add(ListingBookedRange(listing_id=listing_id, date_from=date(2025, 3, 1),
+                                              date_to=date(2025, 3, 4)))
+            db.session.add(ListingRating(listing_id=listing_id, rating_sum=9, review_count=2, stars_4=1, stars_5=1))
+        db.session.commit()
+
+    assert _listings_queries(client, count_queries, 5) == _listings_queries(client, count_queries, 50)
+
+
+def test_listings_page_includes_booked_ranges_and_ratings(app, client, make_listings):
+    listing_id, = make_listings(1)
+    with app.app_context():
+        db.session.add(ListingBookedRange(listing_id=listing_id, date_from=date(2025, 3, 1), date_to=date(2025, 3, 4)))
+        db.session.add(ListingRating(listing_id=listing_id, rating_sum=9, review_count=2, stars_4=1, stars_5=1))
+        db.session.commit()
+
+    listing, = client.get('/v1/listing/listings').get_json()['data']
+    assert listing['unavailableDates'] == [{'from': '2025-03-01', 'to': '2025-03-04'}]
+    assert listing['averageRating'] == 4.5
+
+
+def test_cached_page_is_not_served_after_a_write_by_another_worker(app, client, make_listings):
+    from services import cache, versions
+
+    cache.listings_cache.configure(cache.InProcessBackend())
+    listing_id, = make_listings(1)
+    first = client.get('/v1/listing/listings')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert client.get('/v1/listing/listings').headers['X-Cache'] == 'HIT'
+
+    # What insert_booking commits, without this worker's cache invalidation
+    with app.app_context():
+        db.session.add(ListingBookedRange(listing_id=listing_id, date_from=date(2025, 3, 1), date_to=date(2025, 3, 4)))
+        versions.listings_changed()
+        db.session.commit()
+
+    second = client.get('/v1/listing/listings', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['X-Cache'] == 'MISS'
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.get_json()['data'][0]['unavailableDates'] == [{'from': '2025-03-01', 'to': '2025-03-04'}]
+
+    third = client.get('/v1/listing/listings', headers={'If-None-Match': second.headers['ETag']})
+    assert third.status_code == 304
+    assert client.get('/v1/listing/listings').headers['X-Cache'] == 'HIT'
+
+
+def test_fields_limit_the_attributes_and_skip_unrequested_lookups(client, make_listings, count_queries):
+    make_listings(3)
+
+    def fetch(**query):
+        with count_queries() as queries:
+            response = client.get('/v1/listing/listings', query_string=query)
+        assert response.status_code == 200
+        return response.get_json()['data'], queries.count
+
+    everything, all_queries = fetch()
+    assert {'unavailableDates', 'averageRating'} <= set(everything[0])
+    sparse, sparse_queries = fetch(fields=' price, title ')
+    assert [set(listing) for listing in sparse] == [{'title', 'price'}] * 3
+    # No booked ranges or ratings lookup
+    assert sparse_queries == all_queries - 2
+    assert set(fetch(fields='title,averageRating')[0][0]) == {'title', 'averageRating'}
+
+    response = client.get('/v1/listing/listings', query_string={'fields': 'title,password'})
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Unknown fields: password.')
+
+
+def _listing_ids(client, **query):
+    response = client.get('/v1/listing/listings', query_string=query)
+    assert response.status_code == 200
+    body = response.get_json()
+    return [listing['id'] for listing in body['data']], body['meta']
+
+
+def test_listings_cursor_pages_walk_every_listing_once(client, make_listings):
+    listing_ids = make_listings(25)
+    seen, cursor = [], ''
+    while cursor is not None:
+        ids, meta = _listing_ids(client, cursor=cursor, per_page=10)
+        assert 'total_items' not in meta
+        seen += ids
+        cursor = meta['next_cursor']
+        assert meta['has_next'] == (cursor is not None)
+    assert seen == sorted(listing_ids, reverse=True)
+
+    # Inserts ahead of the cursor do not shift the next page, unlike page=2
+    _, meta = _listing_ids(client, cursor='', per_page=10)
+    make_listings(3)
+    assert _listing_ids(client, cursor=meta['next_cursor'], per_page=10)[0] == seen[10:20]
+    assert _listing_ids(client, page=2, per_page=10)[0] == seen[7:17]
+
+    for cursor in ('zzz', 'WzFd', 'eyJpZCI6ImEifQ'):  # junk, [1], {"id": "a"}
+        assert client.get('/v1/listing/listings', query_string={'cursor': cursor}).status_code == 400
+
+
+def _bulk_row(title, price=100, **overrides):
+    row = {'title': title, 'numberOfPeople': 2, 'country': 'Turkey', 'city': 'Izmir', 'price': price,
+           'availableFrom': '2025-01-01', 'availableTo': '2025-12-31'}
+    row.update(overrides)
+    return row
+
+
+def _bulk(client, headers, body, content_type):
+    return client.post('/v1/listing/bulk', data=body, headers={**headers, 'Content-Type': content_type})
+
+
+def test_bulk_import_ndjson_reports_every_row(client, users, auth_header):
+    headers = auth_header(users['host'], 'host')
+    lines = [
+        json.dumps(_bulk_row('A')),
+        json.dumps(_bulk_row('B')),
+        json.dumps(_bulk_row('a')),  # duplicate of A: text is compared case-insensitively
+        '',
+        'not json',
+        json.dumps(_bulk_row('C', numberOfPeople=40)),
+        json.dumps(_bulk_row('D', price='nan')),
+        json.dumps(_bulk_row('E', price='inf')),
+    ]
+    response = _bulk(client, headers, '\n'.join(lines), 'application/x-ndjson')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['summary'] == {'created': 2, 'duplicate': 1, 'invalid': 4, 'failed': 0}
+    assert [result['status'] for result in body['results']] == [
+        'created', 'created', 'duplicate', 'invalid', 'invalid', 'invalid', 'invalid']
+    assert body['results'][5]['errors'] == ['price must be a finite number.']
+
+    # Rows already in the table are duplicates on the next upload
+    again = _bulk(client, headers, json.dumps(_bulk_row('B')), 'application/x-ndjson').get_json()
+    assert again['summary']['duplicate'] == 1
+
+
+def test_bulk_import_csv(client, users, auth_header):
+    headers = auth_header(users['host'], 'host')
+    body = ('title,numberOfPeople,country,city,price,availableFrom,availableTo\n'
+            'Çeşme House,4,Turkey,Çeşme,150.5,2025-01-01,2025-03-01\n'
+            'Bad Dates,4,Turkey,Izmir,99,2025-03-01,2025-01-01\n'
+            'No Price,4,Turkey,Izmir,,2025-01-01,2025-03-01\n')
+    response = _bulk(client, headers, body.encode('utf-8'), 'text/csv')
+    assert response.get_json()['summary'] == {'created': 1, 'duplicate': 0, 'invalid': 2, 'failed': 0}
+    listing, = client.get('/v1/listing/listings').get_json()['data']
+    assert (listing['title'], listing['city'], listing['price']) == ('Çeşme House', 'Çeşme', 150.5)
+
+
+def test_bulk_import_rejects_a_body_that_is_not_utf8(client, users, auth_header):
+    headers = auth_header(users['host'], 'host')
+    body = ('title,numberOfPeople,country,city,price,availableFrom,availableTo\n'
+            'Çeşme,4,Turkey,Izmir,1,2025-01-01,2025-03-01\n')
+    response = _bulk(client, headers, body.encode('latin-1', errors='replace'), 'text/csv')
+    assert response.status_code == 400
+
+
+def test_bulk_import_reports_rows_the_database_rejects(app, client, users, auth_header, monkeypatch):
+    from services import listings
+
+    parse_listing = listings.parse_listing
+
+    def parse_without_price(data, user_id):
+        values, errors = parse_listing(data, user_id)
+        if values is not None and values['title'] == 'Broken':
+            values['price'] = None  # NOT NULL in the table
+        return values, errors
+
+    monkeypatch.setattr(listings, 'parse_listing', parse_without_price)
+    headers = auth_header(users['host'], 'host')
+    body = '\n'.join(json.dumps(_bulk_row(title)) for title in ('A', 'Broken', 'B'))
+    response = _bulk(client, headers, body, 'application/x-ndjson')
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == ['created', 'failed', 'created']
+    with app.app_context():
+        assert sorted(db.session.execute(select(Listing.title)).scalars()) == ['A', 'B']
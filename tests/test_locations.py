@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+from models import db, Listing
+from services import locations
+
+
+@pytest.fixture
+def add_listings(app, users, monkeypatch):
+    """add_listings((country, city), ...) inserts one listing per location, on a fresh index."""
+    monkeypatch.setattr(locations, 'index', locations.LocationIndex())
+
+    def add(*places):
+        with app.app_context():
+            db.session.add_all(
+                Listing(user_id=users['host'], title=f'Listing {i}', numberOfPeople=2, country=country, city=city,
+                        price=100, availableFrom=date(2025, 1, 1), availableTo=date(2025, 12, 31))
+                for i, (country, city) in enumerate(places)
+            )
+            db.session.commit()
+    return add
+
+
+def _search(client, prefix, **query):
+    response = client.get('/v1/listing/locations', query_string={'prefix': prefix, **query})
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_prefixes_ignore_case_and_accents(client, add_listings):
+    add_listings(('Germany', 'Köln'), ('Germany', 'Köln'), ('Germany', 'KÖLN'), ('Germany', 'Koln'),
+                 ('Türkiye', 'İzmir'))
+
+    # Spellings of one city are merged under the one with the most listings
+    expected = [{'type': 'city', 'country': 'Germany', 'city': 'Köln', 'count': 4}]
+    for prefix in ('köln', 'KOLN', 'ko', '  Kö'):
+        assert _search(client, prefix) == expected
+
+    assert _search(client, 'turk') == [{'type': 'country', 'country': 'Türkiye', 'count': 1}]
+    assert _search(client, 'izm') == [{'type': 'city', 'country': 'Türkiye', 'city': 'İzmir', 'count': 1}]
+    assert _search(client, 'cologne') == []
+
+
+def test_most_listings_come_first_and_new_listings_are_counted(client, users, auth_header, add_listings):
+    add_listings(('Spain', 'Sevilla'), ('Spain', 'Sevilla'), ('Sweden', 'Stockholm'))
+    assert [result.get('city', result['country']) for result in _search(client, 's')] == \
+        ['Sevilla', 'Spain', 'Stockholm', 'Sweden']
+    assert len(_search(client, 's', limit=2)) == 2
+    assert client.get('/v1/listing/locations', query_string={'limit': 51}).status_code == 400
+
+    body = {'title': 'New', 'numberOfPeople': 2, 'country': 'SWEDEN', 'city': 'Stöckholm', 'price': 90,
+            'availableFrom': '2025-01-01', 'availableTo': '2025-12-31'}
+    response = client.post('/v1/listing/insert_listing', json=body, headers=auth_header(users['host'], 'host'))
+    assert response.status_code == 201
+    assert _search(client, 'stock') == [{'type': 'city', 'country': 'Sweden', 'city': 'Stockholm', 'count': 2}]
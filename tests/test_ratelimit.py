@@ -0,0 +1,57 @@
+import pytest
+
+from services import ratelimit
+
+LIMITS = {**ratelimit.DEFAULT_LIMITS, 'auth': '2/minute', 'login': '5/minute', 'login_email': '3/minute',
+          'signup': '2/minute'}
+
+
+@pytest.fixture
+def limited_app(app, monkeypatch):
+    """The app behind one trusted proxy, with small auth budgets."""
+    from app import create_app
+
+    monkeypatch.setenv('TRUSTED_PROXY_HOPS', '1')
+    app = create_app()
+    ratelimit.limiter.configure(ratelimit.InProcessBackend(), LIMITS)
+    yield app
+    ratelimit.limiter.configure(None)
+
+
+def _login(client, email, address):
+    return client.post('/v1/auth/login', json={'email': email, 'password': 'wrong'},
+                       headers={'X-Forwarded-For': address}).status_code
+
+
+def _sign_up(client, number, address):
+    body = {'name': 'Guest', 'email': f'guest{number}@test.local', 'password': 'test-password', 'role': 'guest'}
+    return client.post('/v1/auth/users', json=body, headers={'X-Forwarded-For': address}).status_code
+
+
+def test_login_attempts_are_limited_per_email(limited_app, users):
+    client = limited_app.test_client()
+    assert [_login(client, 'guest@test.local', f'10.0.0.{i}') for i in range(4)] == [400, 400, 400, 429]
+    # Same proxy-forwarded address, other account: not affected, and not the 'auth' budget
+    assert _login(client, 'host@test.local', '10.0.0.1') == 400
+
+
+def test_one_address_cycling_through_emails_is_limited(limited_app):
+    client = limited_app.test_client()
+    statuses = [_login(client, f'guest{i}@test.local', '10.0.0.1') for i in range(6)]
+    assert statuses == [400] * 5 + [429]
+    assert _login(client, 'guest0@test.local', '10.0.0.2') == 400
+
+
+def test_anonymous_clients_behind_a_trusted_proxy_get_their_own_buckets(limited_app):
+    client = limited_app.test_client()
+    assert [_sign_up(client, i, '10.0.0.1') for i in range(3)] == [201, 201, 429]
+    assert _sign_up(client, 3, '10.0.0.2') == 201
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(app, monkeypatch):
+    ratelimit.limiter.configure(ratelimit.InProcessBackend(), LIMITS)
+    try:
+        client = app.test_client()
+        assert [_sign_up(client, i, f'10.0.0.{i}') for i in range(3)] == [201, 201, 429]
+    finally:
+        ratelimit.limiter.configure(None)
@@ -0,0 +1,54 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from models import db, Booking, ListingRating, Review
+
+
+def _review(listing_id, guest_id, rating):
+    booking = Booking(listing_id=listing_id, issuer_guest_id=guest_id, names_of_people='Guest',
+                      date_from=date(2025, 3, 1), date_to=date(2025, 3, 2))
+    db.session.add(booking)
+    db.session.flush()
+    db.session.add(Review(stay_id=booking.id, guest_id=guest_id, rating=rating, comment='Fine'))
+
+
+def _stored(app):
+    with app.app_context():
+        return {row.listing_id: (row.rating_sum, row.review_count, row.stars_4, row.stars_5)
+                for row in db.session.execute(select(ListingRating)).scalars()}
+
+
+def test_reconcile_reports_drift_and_fix_rebuilds_it(app, client, users, make_listings):
+    drifted, missing, orphaned, in_sync = make_listings(4)
+    with app.app_context():
+        for listing_id, rating in ((drifted, 5), (drifted, 4), (missing, 4), (in_sync, 5)):
+            _review(listing_id, users['guest'], rating)
+        db.session.add_all([
+            ListingRating(listing_id=drifted, rating_sum=5, review_count=1, stars_5=1),
+            ListingRating(listing_id=orphaned, rating_sum=3, review_count=1, stars_3=1),
+            ListingRating(listing_id=in_sync, rating_sum=5, review_count=1, stars_5=1),
+        ])
+        db.session.commit()
+    runner = app.test_cli_runner()
+    etag = client.get('/v1/listing/listings').headers['ETag']
+
+    result = runner.invoke(args=['ratings', 'reconcile'])
+    assert result.exit_code == 0
+    assert [line.split(':')[0] for line in result.output.splitlines()[:-1]] == \
+        [f'listing {listing_id}' for listing_id in (drifted, missing, orphaned)]
+    assert result.output.splitlines()[-1] == '3 listings drifted. Re-run with --fix to rebuild them.'
+    assert _stored(app)[drifted] == (5, 1, 0, 1)
+
+    result = runner.invoke(args=['ratings', 'reconcile', '--fix'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[-1] == 'Fixed 3 listings.'
+    assert _stored(app) == {drifted: (9, 2, 1, 1), missing: (4, 1, 1, 0), orphaned: (0, 0, 0, 0),
+                            in_sync: (5, 1, 0, 1)}
+
+    # Cached pages and ETags built on the drifted aggregates are not served again
+    response = client.get('/v1/listing/listings', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert {listing['id']: listing['averageRating'] for listing in response.get_json()['data']}[drifted] == 4.5
+
+    assert runner.invoke(args=['ratings', 'reconcile', '--fix']).output == 'Rating aggregates are in sync.\n'
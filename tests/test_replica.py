@@ -0,0 +1,72 @@
+import shutil
+
+import pytest
+
+from models import db
+from services import cache, replica
+
+
+@pytest.fixture
+def replica_app(app, users, make_listings, tmp_path, monkeypatch):
+    """
+    The app with a replica that is a copy of the primary taken after one
+    listing was created; later writes never reach it.
+    """
+    from app import create_app
+
+    make_listings(1)
+    with app.app_context():
+        db.engine.dispose()
+    shutil.copy(tmp_path / 'test.db', tmp_path / 'replica.db')
+    monkeypatch.setenv('DB_REPLICA_URL', f'sqlite:///{tmp_path / "replica.db"}')
+    app = create_app()
+    cache.listings_cache.configure(cache.InProcessBackend())
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    # db is shared by every app; later apps have no replica bind
+    db.metadatas.pop(replica.REPLICA_BIND, None)
+
+
+def _booked(response):
+    return response.get_json()['data'][0]['unavailableDates']
+
+
+def test_writer_does_not_get_cached_replica_pages(replica_app, users, auth_header):
+    guest = auth_header(users['guest'], 'guest')
+    anonymous = replica_app.test_client()
+    assert anonymous.get('/v1/listing/listings').headers['X-Cache'] == 'MISS'
+    assert anonymous.get('/v1/listing/listings').headers['X-Cache'] == 'HIT'
+
+    writer = replica_app.test_client()
+    body = {'listing_id': 1, 'dateFrom': '2025-06-10', 'dateTo': '2025-06-12', 'namesOfPeople': 'Guest'}
+    assert writer.post('/v1/booking/insert_booking', json=body, headers=guest).status_code == 201
+
+    # The replica has not seen the booking; new pages read from it are not cached meanwhile
+    for _ in range(2):
+        response = anonymous.get('/v1/listing/listings', query_string={'per_page': 5})
+        assert response.headers['X-Cache'] == 'MISS'
+        assert _booked(response) == []
+
+    # The writer reads the primary and never gets a cached page
+    for _ in range(2):
+        response = writer.get('/v1/listing/listings', headers=guest)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert _booked(response) == [{'from': '2025-06-10', 'to': '2025-06-12'}]
+
+
+def test_sticky_cookie_keeps_the_writer_on_the_primary_on_other_workers(replica_app, users, auth_header):
+    guest = auth_header(users['guest'], 'guest')
+    writer = replica_app.test_client()
+    body = {'listing_id': 1, 'dateFrom': '2025-06-10', 'dateTo': '2025-06-12', 'namesOfPeople': 'Guest'}
+    response = writer.post('/v1/booking/insert_booking', json=body, headers=guest)
+    assert replica.STICKY_COOKIE in response.headers['Set-Cookie']
+
+    # A worker that did not handle the write
+    replica._recent_writers.clear()
+    assert _booked(writer.get('/v1/listing/listings', headers=guest)) == [{'from': '2025-06-10', 'to': '2025-06-12'}]
+    # Without the cookie, or with another user's token, reads go to the replica
+    assert _booked(replica_app.test_client().get('/v1/listing/listings', headers=guest)) == []
+    host = auth_header(users['host'], 'host')
+    assert _booked(writer.get('/v1/listing/listings', headers=host)) == []
@@ -0,0 +1,57 @@
+import os
+import time
+from datetime import timedelta
+
+from models import db, ReportJob
+from services import report_jobs
+
+
+def _finished_job(client, headers):
+    response = client.post('/v1/report/jobs', json={'fields': 'title,price'}, headers=headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+    for _ in range(100):
+        job = client.get(f'/v1/report/jobs/{job_id}', headers=headers).get_json()['job']
+        if job['status'] not in (report_jobs.QUEUED, report_jobs.RUNNING):
+            break
+        time.sleep(0.05)
+    assert job['status'] == report_jobs.DONE
+    return job_id
+
+
+def test_missing_result_files_answer_410(app, client, users, auth_header, make_listings):
+    make_listings(3)
+    headers = auth_header(users['admin'], 'admin')
+    job_id = _finished_job(client, headers)
+    result = f'/v1/report/jobs/{job_id}/result'
+    assert len(client.get(result, headers=headers).get_json()['data']) == 3
+
+    with app.app_context():
+        for path in report_jobs.result_paths(job_id):
+            os.remove(path)
+    assert client.get(result, headers=headers).status_code == 410
+    assert client.get(result, query_string={'format': 'ndjson'}, headers=headers).status_code == 410
+
+
+def test_stale_jobs_are_failed_and_purged(app, client, users, auth_header):
+    headers = auth_header(users['admin'], 'admin')
+    with app.app_context():
+        long_ago = report_jobs._now() - timedelta(hours=2)
+        db.session.add_all([
+            ReportJob(id='queued', user_id=users['admin'], status=report_jobs.QUEUED, fields='title',
+                      created_at=long_ago),
+            ReportJob(id='running', user_id=users['admin'], status=report_jobs.RUNNING, fields='title',
+                      created_at=long_ago, started_at=long_ago),
+            ReportJob(id='fresh', user_id=users['admin'], status=report_jobs.RUNNING, fields='title',
+                      created_at=long_ago, started_at=report_jobs._now()),
+        ])
+        db.session.commit()
+
+    job = client.get('/v1/report/jobs/running', headers=headers).get_json()['job']
+    assert job['status'] == report_jobs.FAILED
+    assert job['error'] and job['finished_at']
+    assert client.get('/v1/report/jobs/fresh', headers=headers).get_json()['job']['status'] == report_jobs.RUNNING
+
+    with app.app_context():
+        assert report_jobs.purge(max_age_hours=1) == 2
+        assert [job.id for job in ReportJob.query.all()] == ['fresh']
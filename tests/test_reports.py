@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+import pytest
+
+from models import db, ListingRating
+import routes.report
+
+
+@pytest.fixture
+def report(app, users, auth_header, make_listings):
+    """Admin headers; three listings, the second rated 4.5 from two reviews."""
+    listing_ids = make_listings(3)
+    with app.app_context():
+        db.session.add(ListingRating(listing_id=listing_ids[1], rating_sum=9, review_count=2, stars_4=1, stars_5=1))
+        db.session.commit()
+    return auth_header(users['admin'], 'admin'), listing_ids
+
+
+def _report(client, headers, **query):
+    return client.get('/v1/report/report_listings', query_string=query,
+                      headers={**headers, 'Accept-Encoding': 'gzip'}, buffered=False)
+
+
+def test_ndjson_report_streams_the_json_rows(client, report):
+    headers, listing_ids = report
+    response = _report(client, headers, format='ndjson')
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'Content-Encoding' not in response.headers
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == client.get('/v1/report/report_listings', headers=headers).get_json()['data']
+    assert [row['id'] for row in rows] == [listing_ids[1], listing_ids[0], listing_ids[2]]
+    assert rows[0]['average_rating'] == 4.5
+    assert rows[1]['average_rating'] == 'No reviews'
+
+
+def test_csv_report_streams_one_chunk_per_row(client, report, monkeypatch):
+    headers, listing_ids = report
+    monkeypatch.setattr(routes.report, 'STREAM_BATCH_SIZE', 1)
+    response = _report(client, headers, format='CSV', fields='title,average_rating,rating_histogram')
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=listing_report.csv'
+    assert 'Content-Encoding' not in response.headers
+
+    chunks = list(response.response)
+    assert len(chunks) == len(listing_ids)
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    assert rows[0] == ['title', 'average_rating', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+    assert rows[1] == ['Listing 1', '4.5', '0', '0', '0', '1', '1']
+    assert rows[2] == ['Listing 0', '', '0', '0', '0', '0', '0']
+
+
+def test_report_rejects_unknown_formats_and_fields(client, report):
+    headers, _ = report
+    assert _report(client, headers, format='xml').status_code == 400
+    assert _report(client, headers, format='csv', fields='title,password').status_code == 400
@@ -0,0 +1,65 @@
+import time
+
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+
+def test_create_app_does_not_touch_the_database(tmp_path, monkeypatch):
+    database = tmp_path / 'cold.db'
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{database}')
+    monkeypatch.delenv('DB_CREATE_ALL', raising=False)
+    connects = []
+
+    def on_connect(*args):
+        connects.append(args)
+
+    from app import create_app
+
+    event.listen(Pool, 'connect', on_connect)
+    try:
+        app = create_app()
+    finally:
+        event.remove(Pool, 'connect', on_connect)
+
+    assert connects == []
+    assert not database.exists()  # SQLite creates the file on the first connection
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == f'sqlite:///{database}'
+
+
+def test_db_create_all_still_creates_tables_on_request(tmp_path, monkeypatch):
+    database = tmp_path / 'eager.db'
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{database}')
+    monkeypatch.setenv('DB_CREATE_ALL', 'true')
+
+    from app import create_app
+
+    create_app()
+    assert database.exists()
+
+
+def test_gunicorn_master_creates_missing_tables(tmp_path, monkeypatch):
+    import runpy
+
+    import app as app_module
+    from app import create_app
+
+    database = tmp_path / 'deploy.db'
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{database}')
+    monkeypatch.delenv('DB_INIT_ON_START', raising=False)
+    monkeypatch.setattr(app_module, 'app', create_app())
+
+    runpy.run_path('gunicorn.conf.py')['on_starting'](None)
+    tables = set(sqlalchemy.inspect(sqlalchemy.create_engine(f'sqlite:///{database}')).get_table_names())
+    assert {'listings', 'changeCounters', 'listingBookedRanges', 'listingRatings', 'idempotencyKeys',
+            'reportJobs'} <= tables
+
+
+def test_create_app_is_fast(tmp_path, monkeypatch):
+    # Smoke bound only; benchmarks/startup_bench.py measures cold starts in fresh interpreters
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "cold.db"}')
+    from app import create_app
+
+    started = time.perf_counter()
+    create_app()
+    assert time.perf_counter() - started < 1.0